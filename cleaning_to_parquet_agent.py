@@ -7,14 +7,30 @@ a comprehensive data profile (counts, nulls, uniques, basic outliers) saved to p
 """
 
 import os
+import re
+import csv
 import json
-import glob
 import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 try:
     from google.cloud import storage
@@ -27,21 +43,59 @@ DEFAULT_OUTPUT_DIR = "processed_data"
 EXCHANGE_RATE = 3.8
 MIN_PRICE = 10
 MAX_PRICE = 90000
+_WS_RE = re.compile(r"\s+")
+_URL_RE = re.compile(r"https?://.+")
+# Low-cardinality string columns stored as dictionary-encoded categoricals in Parquet
+CATEGORICAL_COLS = (
+    "currency", "district", "property_type", "location", "element_tag", "element_class"
+)
+PARQUET_ROW_GROUP_SIZE = 64_000
+
+
+def _json_loads(raw: bytes) -> Any:
+    """Parse JSON bytes with orjson when available, stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _parse_payload(raw: bytes, jsonl: bool) -> Any:
+    """JSON document, or a list of records for JSONL (progress files of the cleaning agent)."""
+    if jsonl:
+        return [_json_loads(line) for line in raw.splitlines() if line.strip()]
+    return _json_loads(raw)
+
+
+def _load_json_file(path: str) -> Any:
+    """Read and parse one JSON/JSONL file; returns None if it cannot be loaded."""
+    try:
+        with open(path, "rb") as f:
+            return _parse_payload(f.read(), path.endswith(".jsonl"))
+    except Exception:
+        return None
 
 
 def read_all_cleaned_json(input_dir: str) -> List[Dict[str, Any]]:
-    pattern = os.path.join(input_dir, "*.json")
+    # Same files as glob("*.json") + glob("*.jsonl") (non-hidden), without fnmatch per entry
+    try:
+        with os.scandir(input_dir) as entries:
+            paths = sorted(
+                e.path for e in entries
+                if e.name.endswith((".json", ".jsonl")) and not e.name.startswith(".") and e.is_file()
+            )
+    except OSError:
+        paths = []
     records: List[Dict[str, Any]] = []
-    for path in sorted(glob.glob(pattern)):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    records.extend(data)
-                elif isinstance(data, dict):
-                    records.append(data)
-        except Exception:
-            continue
+    if not paths:
+        return records
+    # Overlap file reads and parsing; map() keeps results in path order
+    max_workers = min(32, (os.cpu_count() or 1) * 4, len(paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        for data in ex.map(_load_json_file, paths):
+            if isinstance(data, list):
+                records.extend(data)
+            elif isinstance(data, dict):
+                records.append(data)
     return records
 
 
@@ -71,11 +125,10 @@ def read_all_cleaned_json_gcs(prefix_uri: str, gcp_keyfile: Optional[str]) -> Li
     records: List[Dict[str, Any]] = []
     for blob in blobs:
         name = blob.name
-        if not name.lower().endswith('.json'):
+        if not name.lower().endswith(('.json', '.jsonl')):
             continue
         try:
-            text = blob.download_as_text()
-            data = json.loads(text)
+            data = _parse_payload(blob.download_as_bytes(), name.lower().endswith('.jsonl'))
             if isinstance(data, list):
                 records.extend(data)
             elif isinstance(data, dict):
@@ -86,7 +139,6 @@ def read_all_cleaned_json_gcs(prefix_uri: str, gcp_keyfile: Optional[str]) -> Li
 
 
 def normalize_records(records: List[Dict[str, Any]]) -> pd.DataFrame:
-    df = pd.json_normalize(records, max_level=1)
     # Standardize expected columns
     preferred_order = [
         "index", "global_index", "scraped_at", "title", "url",
@@ -99,12 +151,11 @@ def normalize_records(records: List[Dict[str, Any]]) -> pd.DataFrame:
         "image_count", "image_urls", "page", "site_page", "element_class", "element_tag",
         "data_completeness", "feature_count", "full_text"
     ]
-    # Ensure columns exist
-    for col in preferred_order:
-        if col not in df.columns:
-            df[col] = pd.NA
-    # Reorder
-    df = df[preferred_order]
+    # Records are flat dicts: build the frame directly in the canonical column order
+    df = pd.DataFrame.from_records(
+        ({k: r.get(k) for k in preferred_order} for r in records),
+        columns=preferred_order,
+    )
     # Coerce types
     numeric_cols = [
         "index", "global_index", "price_numeric", "price_per_sqm", "area_numeric",
@@ -128,11 +179,50 @@ def normalize_records(records: List[Dict[str, Any]]) -> pd.DataFrame:
     return df
 
 
-def write_parquet(df: pd.DataFrame, output_dir: str) -> str:
+def spill_to_arrow(df: pd.DataFrame, spill_dir: Optional[str] = None) -> pd.DataFrame:
+    """Round-trip the frame through an uncompressed Arrow IPC (Feather v2) file.
+    The file is memory-mapped back so only the rebuilt frame stays resident; it is
+    removed afterwards. List columns come back as numpy arrays.
+    """
+    fd, path = tempfile.mkstemp(suffix=".arrow", prefix="normalized_", dir=spill_dir)
+    os.close(fd)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        del table
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all().to_pandas(self_destruct=True)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _to_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a frame with CATEGORICAL_COLS cast to category dtype (input is not modified)."""
+    cats = {c: df[c].astype("category") for c in CATEGORICAL_COLS if c in df.columns}
+    return df.assign(**cats) if cats else df
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """Convert the cleaned frame to the Arrow table written to Parquet."""
+    return pa.Table.from_pandas(_to_categoricals(df), preserve_index=False)
+
+
+def write_parquet(df: pd.DataFrame, output_dir: str, table: Optional[pa.Table] = None) -> str:
     os.makedirs(output_dir, exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     out_path = os.path.join(output_dir, f"urbania_cleaned_{ts}.parquet")
-    df.to_parquet(out_path, engine="pyarrow", index=False)
+    if table is None:
+        table = to_arrow_table(df)
+    with pq.ParquetWriter(
+        out_path, table.schema,
+        compression="zstd", compression_level=3,
+        use_dictionary=True, data_page_version="2.0"
+    ) as writer:
+        writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_SIZE)
     return out_path
 
 
@@ -170,33 +260,61 @@ def parse_amount(value: str) -> float | None:
     if not s:
         return None
 
-    comma_idxs = [i for i, ch in enumerate(s) if ch == ',']
+    n_commas = s.count(',')
     try:
-        if len(comma_idxs) == 0:
+        if n_commas == 0:
             return float(s)
 
         # regla adicional: dígitos antes de la primera coma > 2
-        first = comma_idxs[0]
-        digits_before = sum(1 for ch in s[:first] if ch.isdigit())
+        first = s.find(',')
+        before = s[:first]
+        digits_before = sum(ch.isdigit() for ch in before)
         if digits_before > 2:
-            head = ''.join(ch for ch in s[:first] if ch.isdigit() or ch in '+-.')
+            head = ''.join(ch for ch in before if ch.isdigit() or ch in '+-.')
             return float(head) if head not in ('', '+', '-') else None
 
-        if len(comma_idxs) == 1:
+        if n_commas == 1:
             return float(s.replace(',', ''))
 
         # 2+ comas: cortar en la segunda, eliminar la primera
-        second = comma_idxs[1]
-        trimmed = s[:second]
-        # eliminar la primera coma del tramo
-        first_in_trim = trimmed.find(',')
-        if first_in_trim != -1:
-            trimmed = trimmed[:first_in_trim] + trimmed[first_in_trim+1:]
-        return float(trimmed)
+        second = s.find(',', first + 1)
+        return float(before + s[first + 1:second])
     except ValueError:
         return None
 
 
+def _vec_parse_amount(values: pd.Series) -> pd.Series:
+    """Vectorized parse_amount: same notebook rules applied to a whole Series.
+    pd.to_numeric agrees with float() on ASCII text only, so the rare strings with
+    non-ASCII characters or "_" digit separators go through parse_amount itself.
+    """
+    s = values.astype(str).str.strip()
+    parts = s.str.split(",", n=2, expand=True).reindex(columns=range(3))
+    head = parts[0].fillna("")
+    second = parts[1].fillna("")
+    n_commas = s.str.count(",")
+    digits_before = head.str.count(r"\d")
+    result = np.select(
+        [
+            (n_commas == 0).to_numpy(),
+            (digits_before > 2).to_numpy(),
+            (n_commas == 1).to_numpy(),
+        ],
+        [
+            s.to_numpy(dtype=object),
+            head.str.replace(r"[^0-9+\-.]", "", regex=True).to_numpy(dtype=object),
+            s.str.replace(",", "", regex=False).to_numpy(dtype=object),
+        ],
+        # 2+ comas: cortar en la segunda, eliminar la primera
+        default=(head + second).to_numpy(dtype=object),
+    )
+    out = pd.to_numeric(pd.Series(result, index=values.index), errors="coerce").astype("float64")
+    odd = s.str.contains(r"[^\x00-\x7f]|_", regex=True, na=False).to_numpy()
+    if odd.any():
+        out[odd] = np.array([parse_amount(v) for v in s[odd]], dtype="float64")
+    return out
+
+
 def apply_notebook_cleaning_rules(df: pd.DataFrame) -> pd.DataFrame:
     """
     Reproduce key cleaning steps from verification.ipynb:
@@ -205,8 +323,9 @@ def apply_notebook_cleaning_rules(df: pd.DataFrame) -> pd.DataFrame:
     - Convert USD price_numeric to PEN using FX=3.8
     - Filter rows with price_numeric > 10 and <= 90000
     - Recompute price_per_sqm when area_numeric > 0
+    The input frame is modified in place (no defensive copy); callers must not reuse it.
     """
-    d = df.copy()
+    d = df
 
     # Ensure string series for parsing
     pr = d.get("price_raw")
@@ -227,7 +346,7 @@ def apply_notebook_cleaning_rules(df: pd.DataFrame) -> pd.DataFrame:
     # Compute price_numeric from first segment of price_raw
     first_seg = pr.str.split(" · ").str[0]
     cleaned = first_seg.str.replace("S/", "", regex=False).str.replace("USD", "", regex=False).str.strip()
-    d["price_numeric"] = cleaned.apply(parse_amount)
+    d["price_numeric"] = _vec_parse_amount(cleaned)
 
     # Convert USD prices to PEN at FX 3.8
     usd_final = (d["currency"].astype(str) == "USD") & d["price_numeric"].notna()
@@ -235,7 +354,8 @@ def apply_notebook_cleaning_rules(df: pd.DataFrame) -> pd.DataFrame:
     # Set currency to PEN for all rows after conversion
     d.loc[:,"currency"] = "PEN"
     # Filter price range
-    d = d[(pd.to_numeric(d["price_numeric"], errors="coerce") > MIN_PRICE) & (pd.to_numeric(d["price_numeric"], errors="coerce") <= MAX_PRICE)]
+    pn = pd.to_numeric(d["price_numeric"], errors="coerce")
+    d = d[(pn > MIN_PRICE) & (pn <= MAX_PRICE)]
 
     # Recompute price_per_sqm where possible
     if "area_numeric" in d.columns:
@@ -247,38 +367,61 @@ def apply_notebook_cleaning_rules(df: pd.DataFrame) -> pd.DataFrame:
     return d
 
 
+def _scraped_at_key(df: pd.DataFrame) -> np.ndarray:
+    """scraped_at as an int64 ordering key; missing/unparseable timestamps sort last."""
+    if "scraped_at" not in df.columns:
+        return np.zeros(len(df), dtype="int64")
+    ts = pd.to_datetime(df["scraped_at"], errors="coerce", format="ISO8601")
+    return ts.fillna(pd.Timestamp.max).astype("int64").to_numpy()
+
+
 def deduplicate_df(df: pd.DataFrame) -> pd.DataFrame:
     """Remove duplicate rows using robust, stable keys.
     Priority 1: use unique URL when available.
     Priority 2: use a composite business key ignoring non-stable fields like image_urls.
     Also canonicalize list columns (e.g., image_urls) to make them comparable if needed.
+    The input frame is modified in place (no defensive copy); callers must not reuse it.
     """
-    dfc = df.copy()
+    dfc = df
 
     # Canonicalize list-like columns to tuples (avoids unhashable when needed)
     if "image_urls" in dfc.columns:
-        dfc["image_urls"] = dfc["image_urls"].apply(
-            lambda x: tuple(sorted(set(x))) if isinstance(x, list) else x
-        )
+        urls = dfc["image_urls"]
+        is_list = urls.map(lambda v: isinstance(v, (list, np.ndarray))).to_numpy(dtype=bool)
+        if is_list.any():
+            sub = urls[is_list]
+            dfc.loc[is_list, "image_urls"] = pd.Series(
+                [tuple(sorted({*x})) for x in sub], index=sub.index, dtype=object
+            )
 
     before = len(dfc)
 
-    dfc = dfc.sort_values(by=["scraped_at"], na_position="last")
+    # Earliest scrape wins; ordered via an int64 key instead of sorting the whole frame
+    ts_key = _scraped_at_key(dfc)
 
     # Split by URL presence to avoid collapsing all NaN URLs into one
     if "url" in dfc.columns:
-        has_url = dfc["url"].notna() & (dfc["url"].astype(str).str.len() > 3) & (dfc["url"].astype(str).str.startswith("http"))
-        df_with_url = dfc.loc[has_url]
-        df_no_url = dfc.loc[~has_url]
+        has_url = dfc["url"].astype("string").str.match(_URL_RE, na=False).to_numpy()
+        url_pos = np.flatnonzero(has_url)
+        no_url_pos = np.flatnonzero(~has_url)
+
+        # Dedup rows that have a real URL: hash-group by URL, keep the earliest row
+        first_pos = (
+            pd.Series(ts_key[url_pos], index=url_pos)
+            .groupby(dfc["url"].to_numpy()[url_pos], sort=False)
+            .idxmin()
+        )
+        # Emit the kept rows in scraped_at order (ties by position), sorting only the survivors
+        kept = np.sort(first_pos.to_numpy())
+        df_with_url = dfc.iloc[kept[np.argsort(ts_key[kept], kind="stable")]]
 
-        # Dedup rows that have a real URL
-        df_with_url = df_with_url.drop_duplicates(subset=["url"], keep="first")
+        # Only URL-less rows need ordering for the keep="first" dedups below
+        df_no_url = dfc.iloc[no_url_pos[np.argsort(ts_key[no_url_pos], kind="stable")]]
 
         # For rows without URL, prefer dedup by normalized full_text when available
         if "full_text" in df_no_url.columns:
-            tmp = df_no_url.copy()
-            tmp["_ft_norm"] = (
-                tmp["full_text"].astype(str).str.replace("\s+", " ", regex=True).str.strip()
+            tmp = df_no_url.assign(
+                _ft_norm=df_no_url["full_text"].astype(str).str.replace(_WS_RE, " ", regex=True).str.strip()
             )
             df_no_url = tmp.drop_duplicates(subset=["_ft_norm"], keep="first").drop(columns=["_ft_norm"])
         # Fallback composite key (ignores image_urls)
@@ -293,9 +436,10 @@ def deduplicate_df(df: pd.DataFrame) -> pd.DataFrame:
 
         dfc = pd.concat([df_with_url, df_no_url], ignore_index=True)
     else:
+        dfc = dfc.iloc[np.argsort(ts_key, kind="stable")]
         # No URL column: use full_text if present
         if "full_text" in dfc.columns:
-            dfc["_ft_norm"] = dfc["full_text"].astype(str).str.replace("\s+", " ", regex=True).str.strip()
+            dfc["_ft_norm"] = dfc["full_text"].astype(str).str.replace(_WS_RE, " ", regex=True).str.strip()
             dfc = dfc.drop_duplicates(subset=["_ft_norm"], keep="first").drop(columns=["_ft_norm"]) 
         else:
             key_cols = [
@@ -312,13 +456,106 @@ def deduplicate_df(df: pd.DataFrame) -> pd.DataFrame:
     return dfc
 
 
-def basic_analysis(df: pd.DataFrame) -> Dict[str, Any]:
+def _quartiles(arr: np.ndarray) -> Tuple[float, float]:
+    """Q1/Q3 with pandas' linear interpolation, via one O(n) np.partition instead of sorting."""
+    n = arr.size
+    pos = [0.25 * (n - 1), 0.75 * (n - 1)]
+    lo = [int(np.floor(p)) for p in pos]
+    hi = [min(k + 1, n - 1) for k in lo]
+    part = np.partition(arr, sorted(set(lo + hi)))
+    return tuple(
+        float(part[l] + (part[h] - part[l]) * (p - l)) for p, l, h in zip(pos, lo, hi)
+    )
+
+
+def clean_and_dedup_polars(df: pd.DataFrame) -> pd.DataFrame:
+    """Polars (lazy) equivalent of apply_notebook_cleaning_rules followed by deduplicate_df.
+    Expects the canonical frame produced by normalize_records.
+    """
+    if pl is None:
+        raise RuntimeError("polars not installed")
+    before = len(df)
+    lf = pl.from_pandas(df).lazy()
+    text_cols = ["price_raw", "currency", "url", "full_text", "scraped_at"]
+    lf = lf.with_columns([pl.col(c).cast(pl.Utf8) for c in text_cols])
+
+    # Currency inference and first price segment (same rules as the pandas path)
+    pr = pl.col("price_raw").fill_null("None")
+    pen = pr.str.contains("S/", literal=True)
+    usd = pr.str.contains("USD", literal=True) & ~pen
+    cleaned = (
+        pr.str.split(" · ").list.first()
+        .str.replace_all("S/", "", literal=True)
+        .str.replace_all("USD", "", literal=True)
+        .str.strip_chars()
+    )
+    parts = cleaned.str.splitn(",", 3)
+    head = parts.struct.field("field_0").fill_null("")
+    second = parts.struct.field("field_1").fill_null("")
+    n_commas = cleaned.str.count_matches(",", literal=True)
+    amount = (
+        pl.when(n_commas == 0).then(cleaned)
+        .when(head.str.count_matches(r"\d") > 2).then(head.str.replace_all(r"[^0-9+\-.]", ""))
+        .when(n_commas == 1).then(cleaned.str.replace_all(",", "", literal=True))
+        .otherwise(head + second)
+        .cast(pl.Float64, strict=False)
+    )
+    lf = lf.with_columns(
+        pl.when(pen).then(pl.lit("PEN"))
+        .when(usd).then(pl.lit("USD"))
+        .otherwise(pl.col("currency"))
+        .alias("currency"),
+        amount.alias("price_numeric"),
+    )
+    price = pl.col("price_numeric")
+    lf = lf.with_columns(
+        pl.when(pl.col("currency") == "USD").then(price * EXCHANGE_RATE).otherwise(price)
+        .alias("price_numeric"),
+        pl.lit("PEN").alias("currency"),
+    ).filter(price.is_not_nan() & (price > MIN_PRICE) & (price <= MAX_PRICE))
+    area = pl.col("area_numeric").cast(pl.Float64, strict=False)
+    lf = lf.with_columns(
+        pl.when(area > 0).then(price / area).otherwise(pl.col("price_per_sqm").cast(pl.Float64))
+        .alias("price_per_sqm")
+    )
+
+    # Dedup: canonical image_urls, earliest scrape wins
+    if lf.collect_schema()["image_urls"].base_type() == pl.List:
+        lf = lf.with_columns(pl.col("image_urls").list.unique().list.sort())
+    lf = lf.with_columns(
+        pl.col("scraped_at").str.strptime(pl.Datetime("us"), "%Y-%m-%dT%H:%M:%S%.f", strict=False)
+        .alias("_ts"),
+        # Anchored like the pandas path's str.match
+        pl.col("url").str.contains("^" + _URL_RE.pattern).fill_null(False).alias("_has_url"),
+    ).sort("_ts", nulls_last=True, maintain_order=True)
+    with_url = lf.filter(pl.col("_has_url")).unique(subset=["url"], keep="first", maintain_order=True)
+    key_cols = [
+        "title", "location", "property_type", "price_numeric",
+        "area_numeric", "bedrooms", "bathrooms"
+    ]
+    no_url = (
+        lf.filter(~pl.col("_has_url"))
+        .with_columns(
+            pl.col("full_text").fill_null("None").str.replace_all(_WS_RE.pattern, " ")
+            .str.strip_chars().alias("_ft_norm")
+        )
+        .unique(subset=["_ft_norm"], keep="first", maintain_order=True)
+        .unique(subset=key_cols, keep="first", maintain_order=True)
+        .drop("_ft_norm")
+    )
+    out = pl.concat([with_url, no_url]).drop(["_ts", "_has_url"]).collect().to_pandas()
+    print(f"Cleaning + dedup (polars): {before} -> {len(out)} rows")
+    return out
+
+
+def basic_analysis(df: pd.DataFrame, table: Optional[pa.Table] = None) -> Dict[str, Any]:
     report: Dict[str, Any] = {}
     report["row_count"] = int(len(df))
     report["columns"] = list(df.columns)
-    # Null counts
-    nulls = df.isna().sum().to_dict()
-    report["null_counts"] = {k: int(v) for k, v in nulls.items()}
+    # Null counts: Arrow keeps them as column metadata (NaN is converted to null)
+    if table is None:
+        table = to_arrow_table(df)
+    report["null_counts"] = {name: int(table.column(name).null_count) for name in table.column_names}
     # Unique counts (limit to reasonable columns)
     unique_cols = [
         "location", "district", "property_type", "currency"
@@ -333,28 +570,39 @@ def basic_analysis(df: pd.DataFrame) -> Dict[str, Any]:
         "price_numeric", "area_numeric", "bedrooms", "bathrooms", "price_per_sqm"
     ]
     stats: Dict[str, Any] = {}
-    for c in numeric_cols:
-        if c in df.columns:
-            desc = df[c].describe().to_dict()
-            # convert numpy types to native
-            stats[c] = {k: (float(v) if hasattr(v, "item") else v) for k, v in desc.items()}
+    present = [c for c in numeric_cols if c in df.columns]
+    if present:
+        # Same fields as Series.describe(), computed in two passes over all columns
+        num = df[present]
+        agg = num.agg(["count", "mean", "std", "min", "max"])
+        qs = num.quantile([0.25, 0.5, 0.75])
+        for c in present:
+            stats[c] = {
+                "count": float(agg.at["count", c]),
+                "mean": float(agg.at["mean", c]),
+                "std": float(agg.at["std", c]),
+                "min": float(agg.at["min", c]),
+                "25%": float(qs.at[0.25, c]),
+                "50%": float(qs.at[0.5, c]),
+                "75%": float(qs.at[0.75, c]),
+                "max": float(agg.at["max", c]),
+            }
     report["descriptive_stats"] = stats
     # Simple outlier flags via IQR for price_numeric and price_per_sqm
     outliers: Dict[str, Any] = {}
     for c in ["price_numeric", "price_per_sqm"]:
         if c in df.columns:
-            s = df[c].dropna()
-            if len(s) >= 10:
-                q1 = s.quantile(0.25)
-                q3 = s.quantile(0.75)
+            arr = pd.to_numeric(df[c], errors="coerce").dropna().to_numpy(dtype="float64")
+            if arr.size >= 10:
+                q1, q3 = _quartiles(arr)
                 iqr = q3 - q1
                 lower = q1 - 1.5 * iqr
                 upper = q3 + 1.5 * iqr
                 outliers[c] = {
                     "lower_bound": float(lower),
                     "upper_bound": float(upper),
-                    "num_below": int((s < lower).sum()),
-                    "num_above": int((s > upper).sum())
+                    "num_below": int(np.count_nonzero(arr < lower)),
+                    "num_above": int(np.count_nonzero(arr > upper))
                 }
     report["outliers_iqr"] = outliers
     return report
@@ -369,7 +617,10 @@ def save_analysis(report: Dict[str, Any], output_dir: str) -> str:
         json.dump(report, f, ensure_ascii=False, indent=2)
     # Also save a lightweight CSV summary of nulls
     nulls_csv = os.path.join(analysis_dir, f"null_counts_{ts}.csv")
-    pd.Series(report.get("null_counts", {})).to_csv(nulls_csv, header=["null_count"]) 
+    with open(nulls_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["", "null_count"])
+        writer.writerows(report.get("null_counts", {}).items())
     return out_json
 
 
@@ -381,6 +632,8 @@ def main():
     parser.add_argument("--output-gcs-prefix", type=str, default=None, help="GCS prefix (gs://bucket/path) to upload Parquet (and analysis)")
     parser.add_argument("--gcp-keyfile", type=str, default=None, help="Path to GCP service account JSON key")
     parser.add_argument("--cloud-only", action="store_true", help="Skip local writes; only upload to GCS")
+    parser.add_argument("--spill", action="store_true", help="Spill the normalized frame to a temporary Arrow IPC file and memory-map it back")
+    parser.add_argument("--engine", choices=["pandas", "polars"], default="pandas", help="Engine for the cleaning + dedup stages")
     args = parser.parse_args()
 
     print("=== Cleaning → Parquet Agent ===")
@@ -405,13 +658,27 @@ def main():
     df = normalize_records(records)
     print(f"Normalized to dataframe with shape: {df.shape}")
 
-    # Apply notebook cleaning steps before deduplication
-    df = apply_notebook_cleaning_rules(df)
-    print(f"After notebook cleaning rules: {df.shape}")
+    if args.spill:
+        # Drop the raw records and keep only the Arrow-backed copy of the frame
+        del records
+        df = spill_to_arrow(df)
+        print("Normalized frame spilled to Arrow IPC and reloaded")
 
-    # Deduplicate before writing
-    df = deduplicate_df(df)
-    parquet_path = write_parquet(df, args.output_dir)
+    if args.engine == "polars":
+        if pl is None:
+            print("ERROR: polars not installed; cannot use --engine polars")
+            return
+        # Cleaning rules + dedup as a single lazy Polars query
+        df = clean_and_dedup_polars(df)
+    else:
+        # Apply notebook cleaning steps before deduplication
+        df = apply_notebook_cleaning_rules(df)
+        print(f"After notebook cleaning rules: {df.shape}")
+
+        # Deduplicate before writing
+        df = deduplicate_df(df)
+    table = to_arrow_table(df)
+    parquet_path = write_parquet(df, args.output_dir, table=table)
     if not args.cloud_only:
         print(f"Parquet written to: {parquet_path}")
     # Upload parquet to GCS if configured
@@ -420,7 +687,7 @@ def main():
         if dest:
             print(f"Parquet uploaded to: {dest}")
 
-    report = basic_analysis(df)
+    report = basic_analysis(df, table=table)
     report_path = save_analysis(report, args.output_dir)
     if not args.cloud_only:
         print(f"Analysis report saved to: {report_path}")
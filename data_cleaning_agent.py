@@ -10,19 +10,45 @@ Author: Data Cleaning Agent
 Date: September 2024
 """
 
+import argparse
+import asyncio
+import io
+import itertools
 import json
 import os
 import re
+import sqlite3
 import time
-from typing import Dict, List, Optional, Any
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from hashlib import blake2b
 import openai
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from pathlib import Path
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 try:
     from google.cloud import storage
+    from google.cloud.storage.retry import DEFAULT_RETRY
+    from requests.adapters import HTTPAdapter
 except Exception:
     storage = None
 
@@ -42,15 +68,546 @@ LIMA_DISTRICTS = [
     "Surquillo", "Villa El Salvador", "Villa María del Triunfo"
 ]
 
+# Constant parts of the analysis prompt; only full_text, current_location and the districts
+# found locally in the text (the full district list is not sent) are spliced in per property
+_PROMPT_HEAD = """
+Analiza el siguiente texto de una propiedad inmobiliaria en Lima, Perú y extrae/corrige la información solicitada.
+
+TEXTO DE LA PROPIEDAD:
+"""
+_PROMPT_LOCATION = "\n\nUBICACIÓN ACTUAL: "
+_PROMPT_DISTRICTS = "\n\nDISTRITOS DE LIMA DETECTADOS EN EL TEXTO: "
+_PROMPT_FIELDS = """{
+    "price_raw": "precio como aparece en el texto (ej: 'S/ 250,000', 'USD 180,000', 'Consultar precio') o 'N/A'",
+    "price_numeric": número sin comas ni símbolos o null, si hay precio en dolares y soles, usar el precio en soles. Tipicamente el precio debería estar entre 10 y 40000, si excede, revisa el formato y corrige los errores
+    "property_type": identifica si es casa o departamento (solamente puede tener esos valores),
+    "currency": "PEN", "USD" o "EUR",
+    "location": "distrito específico de Lima encontrado en el texto o 'Lima' si no se especifica",
+    "area_raw": "área como aparece en el texto (ej: '120 m²', '80 m² tot.') o 'N/A'",
+    "area_numeric": número del área en m² o null,
+    "bedrooms": número de dormitorios o null,
+    "bathrooms": número de baños o null,
+    "has_parking": true/false (buscar palabras como 'cochera', 'estacionamiento', 'garage'),
+    "parking_count": número de estacionamientos o 0,
+    "has_pool": true/false (buscar 'piscina', 'pool'),
+    "has_garden": true/false (buscar 'jardín', 'garden', 'área verde'),
+    "has_balcony": true/false (buscar 'balcón', 'balcony'),
+    "has_elevator": true/false (buscar 'ascensor', 'elevator'),
+    "has_security": true/false (buscar 'seguridad', 'security', 'portero', 'vigilancia'),
+    "has_gym": true/false (buscar 'gimnasio', 'gym'),
+    "is_furnished": true/false (buscar 'amoblado', 'furnished', 'amueblado'),
+    "allows_pets": true/false (buscar 'mascotas', 'pets'),
+    "is_new": true/false (buscar 'estreno', 'nuevo', 'new', 'en planos'),
+    "has_terrace": true/false (buscar 'terraza', 'terrace'),
+    "has_laundry": true/false (buscar 'lavandería', 'laundry'),
+    "has_air_conditioning": true/false (buscar 'aire acondicionado', 'A/C', 'AC', 'climatizado')
+}
+
+IMPORTANTE:
+- Para location, usa EXACTAMENTE uno de los distritos detectados; si no hay ninguno, usa el nombre oficial de un distrito de Lima que aparezca en el texto o 'Lima'
+- Si encuentras "Santa Catalina, La Victoria", el distrito es "La Victoria"
+- Para precios, extrae el número completo (ej: si dice "S/ 250,000" → price_numeric: 250000)
+- Para áreas, extrae solo el número en m² (ej: si dice "120 m²" → area_numeric: 120)
+- Busca sinónimos y variaciones de las características (ej: "cochera" = parking)
+- Si no encuentras información específica, usa null para números y false para booleanos
+
+Responde SOLO con el JSON, sin explicaciones adicionales.
+"""
+_PROMPT_TAIL = """
+
+Necesito que analices el texto y me proporciones la siguiente información en formato JSON EXACTO:
+
+""" + _PROMPT_FIELDS
+
+# Micro-batch variant: K numbered listings answered as one JSON object {"propiedades": [...]}
+_BATCH_PROMPT_HEAD = """
+Analiza los siguientes textos de propiedades inmobiliarias en Lima, Perú y extrae/corrige la información solicitada para CADA una.
+"""
+_BATCH_PROMPT_FORMAT = """
+Devuelve un objeto JSON {{"propiedades": [...]}} con exactamente {k} objetos, uno por propiedad y en el mismo orden ([1] primero), cada uno en este formato JSON EXACTO:
+
+"""
+
+_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "Eres un experto analista de datos inmobiliarios. Analiza textos de propiedades y extrae información estructurada con precisión. Responde siempre en JSON."
+}
+
+# Fields taken from the GPT response; also the basis of data_completeness
+FIELDS_TO_UPDATE = [
+    'price_raw', 'price_numeric', 'currency', 'has_price',
+    'location', 'has_location', 'area_raw', 'area_numeric',
+    'bedrooms', 'bathrooms', 'has_parking', 'parking_count',
+    'has_pool', 'has_garden', 'has_balcony', 'has_elevator',
+    'has_security', 'has_gym', 'is_furnished', 'allows_pets',
+    'is_new', 'has_terrace', 'has_laundry', 'has_air_conditioning'
+]
+
+# Boolean features counted in feature_count
+BOOLEAN_FEATURES = [
+    'has_parking', 'has_pool', 'has_garden', 'has_balcony',
+    'has_elevator', 'has_security', 'has_gym', 'is_furnished',
+    'allows_pets', 'is_new', 'has_terrace', 'has_laundry',
+    'has_air_conditioning'
+]
+
+# Values that count as missing for data_completeness
+EMPTY_VALUES = [None, "N/A", "", False]
+
+# Below this concurrency the SDK's httpx transport is fine; above it use aiohttp if installed
+AIOHTTP_MIN_CONCURRENCY = 10
+
+# Resumable GCS uploads stream in chunks of this size (multiple of 256 KiB)
+GCS_CHUNK_SIZE = 16 * 1024 * 1024
+# Inputs at least this large are fetched as parallel ranged GETs instead of one stream
+GCS_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+GCS_RANGE_BYTES = 32 * 1024 * 1024
+GCS_RANGE_WORKERS = 8
+# The GCS copy of the progress JSONL is re-uploaded once this many new records have accumulated
+GCS_PROGRESS_EVERY = 1000
+
+# Semantic cache: listings whose full_text embeddings are this similar share one GPT answer
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMS = 256
+EMBEDDING_BATCH = 512
+
+# Structured Outputs schema for the GPT reply (strict mode: every key required, nulls allowed)
+_NULLABLE_NUMBER = {"type": ["number", "null"]}
+_NULLABLE_INT = {"type": ["integer", "null"]}
+PROP_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "price_raw": {"type": "string"},
+        "price_numeric": _NULLABLE_NUMBER,
+        "property_type": {"type": "string", "enum": ["casa", "departamento"]},
+        "currency": {"type": "string", "enum": ["PEN", "USD", "EUR"]},
+        "location": {"type": "string"},
+        "area_raw": {"type": "string"},
+        "area_numeric": _NULLABLE_NUMBER,
+        "bedrooms": _NULLABLE_INT,
+        "bathrooms": _NULLABLE_INT,
+        "parking_count": {"type": "integer"},
+        **{field: {"type": "boolean"} for field in [
+            'has_parking', 'has_pool', 'has_garden', 'has_balcony', 'has_elevator',
+            'has_security', 'has_gym', 'is_furnished', 'allows_pets', 'is_new',
+            'has_terrace', 'has_laundry', 'has_air_conditioning'
+        ]},
+    },
+}
+PROP_SCHEMA["required"] = list(PROP_SCHEMA["properties"])
+# Part of every cache key: changing the prompt or the reply schema invalidates cached answers
+_PROMPT_FINGERPRINT = blake2b(
+    json.dumps([_SYSTEM_MESSAGE, _PROMPT_HEAD, _PROMPT_TAIL, PROP_SCHEMA], sort_keys=True).encode('utf-8'),
+    digest_size=8
+).hexdigest()
+_JSON_TYPES = {"string": str, "number": (int, float), "integer": int, "boolean": bool, "null": type(None)}
+
+
+def _valid_answer(answer: Any) -> bool:
+    """Check a model answer against PROP_SCHEMA's keys/types and require a price or a district.
+    Used to decide whether a local model's answer is good enough or GPT must be asked.
+    """
+    if not isinstance(answer, dict):
+        return False
+    for field, spec in PROP_SCHEMA["properties"].items():
+        if field not in answer:
+            return False
+        value = answer[field]
+        types = spec["type"] if isinstance(spec["type"], list) else [spec["type"]]
+        if isinstance(value, bool) and "boolean" not in types:
+            return False  # bool is an int subclass
+        if not isinstance(value, tuple(_JSON_TYPES[t] for t in types)):
+            return False
+        if "enum" in spec and value not in spec["enum"]:
+            return False
+    return answer["price_numeric"] is not None or answer["location"] not in ("", "N/A", "Lima")
+
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {"propiedades": {"type": "array", "items": PROP_SCHEMA}},
+    "required": ["propiedades"],
+}
+# Models that accept response_format=json_schema; older ones get plain JSON mode
+STRUCTURED_OUTPUT_MODELS = ('gpt-4o', 'gpt-4.1', 'gpt-5', 'o1', 'o3', 'o4')
+
+
+def _loads_json(text: str | bytes) -> Any:
+    """Parse JSON with orjson when available (its errors subclass json.JSONDecodeError)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _dumps_jsonl_line(obj: Any) -> bytes:
+    """Serialize to one compact JSON line (with trailing newline)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+def _iter_json_records(f) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a top-level JSON array (or a single object) from a binary file.
+    Uses ijson so the document is never held in memory as a whole; falls back to a full parse.
+    """
+    if ijson is None:
+        data = _loads_json(f.read())
+    else:
+        events = ijson.parse(f, use_float=True)
+        first = next(events, None)
+        if first is None:
+            return
+        if first[1] == 'start_array':
+            yield from ijson.items(itertools.chain([first], events), 'item')
+            return
+        data = next(ijson.items(itertools.chain([first], events), ''))
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        yield data
+    else:
+        raise ValueError("Input JSON must be a list or object")
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+# Local (regex) extraction: listings where these all resolve skip the GPT call
+PRICE_RE = re.compile(r'(S/\.?|USD|US\$|\$)\s*(\d[\d.,]*)')
+AREA_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*m[²2]', re.IGNORECASE)
+BEDROOMS_RE = re.compile(r'(\d+)\s*(?:dormitorio|dorm\b|habitacion|hab\b|bedroom)', re.IGNORECASE)
+BATHROOMS_RE = re.compile(r'(\d+)\s*(?:bano|bathroom)', re.IGNORECASE)
+PARKING_COUNT_RE = re.compile(r'(\d+)\s*(?:estacionamiento|cochera)', re.IGNORECASE)
+# Same keyword sets the prompt asks GPT to look for (matched on accent-folded lowercase text)
+FEATURE_KEYWORDS = {
+    'has_parking': ['cochera', 'estacionamiento', 'garage', 'garaje'],
+    'has_pool': ['piscina', 'pool'],
+    'has_garden': ['jardin', 'garden', 'area verde'],
+    'has_balcony': ['balcon', 'balcony'],
+    'has_elevator': ['ascensor', 'elevator'],
+    'has_security': ['seguridad', 'security', 'portero', 'vigilancia'],
+    'has_gym': ['gimnasio', 'gym'],
+    'is_furnished': ['amoblado', 'amueblado', 'furnished'],
+    'allows_pets': ['mascota', 'pet friendly', 'pets'],
+    'is_new': ['estreno', 'nuevo', 'en planos'],
+    'has_terrace': ['terraza', 'terrace'],
+    'has_laundry': ['lavanderia', 'laundry'],
+    'has_air_conditioning': ['aire acondicionado', 'climatizado'],
+}
+DISTRICT_ALIASES = {'surco': 'Santiago de Surco', 'magdalena': 'Magdalena del Mar', 'smp': 'San Martín de Porres'}
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so 'Jesús María' and 'jesus maria' match alike."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# One alternation per scan: longest names first so 'San Juan de Miraflores' beats 'Miraflores'
+_DISTRICT_BY_KEY = {_fold(d): d for d in LIMA_DISTRICTS}
+_DISTRICT_BY_KEY.update(DISTRICT_ALIASES)
+_DISTRICT_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(_DISTRICT_BY_KEY, key=len, reverse=True)) + r')\b'
+)
+# One pattern per amenity (plurals too), combined into a single named-group alternation
+# so all amenities are found in one scan of the text
+FEATURE_PATTERNS = {
+    field: rf"\b(?:{'|'.join(re.escape(w) for w in words)})(?:e?s)?\b"
+    for field, words in FEATURE_KEYWORDS.items()
+}
+_FEATURE_RE = re.compile('|'.join(f"(?P<{field}>{pattern})" for field, pattern in FEATURE_PATTERNS.items()))
+
+
+def _districts_in(folded_text: str) -> List[str]:
+    """Official names of the Lima districts mentioned in accent-folded text, in order of appearance."""
+    return list(dict.fromkeys(_DISTRICT_BY_KEY[m.group(1)] for m in _DISTRICT_RE.finditer(folded_text)))
+
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+CONDENSED_CHARS = 800  # window of full_text sent to GPT
+CONDENSED_LEAD = 200   # chars kept before the first price/area mention
+
+
+def _condense(full_text: str) -> str:
+    """Collapse whitespace/HTML and keep a window around the first price or area mention,
+    dropping agency footers and disclaimers that only cost prompt tokens.
+    """
+    text = _WS_RE.sub(' ', _HTML_TAG_RE.sub(' ', full_text)).strip()
+    if len(text) <= CONDENSED_CHARS:
+        return text
+    anchor = PRICE_RE.search(text) or AREA_RE.search(text)
+    start = max(0, anchor.start() - CONDENSED_LEAD) if anchor else 0
+    return text[start:start + CONDENSED_CHARS]
+
+
+def _extract_booleans(folded_text: str) -> Dict[str, bool]:
+    """Amenity flags found by keyword in accent-folded text."""
+    found = {m.lastgroup for m in _FEATURE_RE.finditer(folded_text)}
+    return {field: field in found for field in FEATURE_KEYWORDS}
+
+
+def _parse_local_number(raw: str) -> Optional[float]:
+    """'2,500' / '2.500' / '1,200.50' / '85.5' -> float; None if the separators are ambiguous."""
+    raw = raw.strip('.,')
+    if ',' in raw and '.' in raw:
+        decimal = ',' if raw.rfind(',') > raw.rfind('.') else '.'
+        raw = raw.replace('.' if decimal == ',' else ',', '').replace(decimal, '.')
+    elif ',' in raw or '.' in raw:
+        sep = ',' if ',' in raw else '.'
+        parts = raw.split(sep)
+        if all(len(p) == 3 for p in parts[1:]):
+            raw = ''.join(parts)  # thousands separators
+        elif len(parts) == 2:
+            raw = parts[0] + '.' + parts[1]
+        else:
+            return None
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def _as_number(value: float) -> float | int:
+    return int(value) if value.is_integer() else value
+
+
+def _local_extract(full_text: str) -> Dict[str, Any]:
+    """Regex pass over full_text for the fields GPT would return.
+    Only fields found with confidence are included; booleans are always included.
+    """
+    result: Dict[str, Any] = {}
+    folded = _fold(full_text)
+
+    # Price: prefer soles when both currencies are listed (same rule as the prompt)
+    prices = [(m.group(0), m.group(1), _parse_local_number(m.group(2))) for m in PRICE_RE.finditer(full_text)]
+    prices = [p for p in prices if p[2] is not None]
+    if prices:
+        raw, symbol, amount = next((p for p in prices if p[1].startswith('S/')), prices[0])
+        if 10 <= amount <= 40000:  # typical rent range; anything else goes to GPT
+            result['price_raw'] = raw.strip()
+            result['price_numeric'] = _as_number(amount)
+            result['currency'] = 'PEN' if symbol.startswith('S/') else 'USD'
+
+    # District: first specific district mentioned ('Lima' alone is not specific)
+    specific = [d for d in _districts_in(folded) if d != 'Lima']
+    if specific:
+        result['location'] = specific[0]
+
+    area = AREA_RE.search(full_text)
+    if area:
+        value = _parse_local_number(area.group(1))
+        if value:
+            result['area_raw'] = area.group(0)
+            result['area_numeric'] = _as_number(value)
+
+    bedrooms = BEDROOMS_RE.search(folded)
+    if bedrooms:
+        result['bedrooms'] = int(bedrooms.group(1))
+    bathrooms = BATHROOMS_RE.search(folded)
+    if bathrooms:
+        result['bathrooms'] = int(bathrooms.group(1))
+
+    result.update(_extract_booleans(folded))
+    parking = PARKING_COUNT_RE.search(folded)
+    result['parking_count'] = int(parking.group(1)) if parking else int(result['has_parking'])
+    return result
+
+
+def _local_complete(local: Dict[str, Any]) -> bool:
+    """True when the regex pass found everything GPT is needed for."""
+    return all(k in local for k in ('price_numeric', 'location', 'area_numeric', 'bedrooms', 'bathrooms'))
+
+
+# Properties cleaned by an earlier run (these fields set, completeness >= threshold) are skipped
+COMPLETE_REQUIRED_FIELDS = ('price_numeric', 'location', 'area_numeric', 'bedrooms')
+COMPLETE_MIN_COMPLETENESS = 90
+
+
+def _already_complete(property_data: Dict[str, Any]) -> bool:
+    return (
+        (property_data.get('data_completeness') or 0) >= COMPLETE_MIN_COMPLETENESS
+        and all(property_data.get(f) not in (None, "", "N/A") for f in COMPLETE_REQUIRED_FIELDS)
+    )
+
+
+def _estimate_tokens(body: Dict[str, Any]) -> int:
+    """Rough prompt+completion token count for rate limiting (~4 chars per token)."""
+    prompt_chars = sum(len(m.get('content') or '') for m in body.get('messages', []))
+    return prompt_chars // 4 + body.get('max_tokens', 0)
+
+
+class RateLimiter:
+    """Dual token bucket (requests/min and tokens/min) shared by all in-flight requests.
+    Buckets refill continuously; a missing limit (None) never blocks.
+    """
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float]):
+        self.rpm_capacity = float(rpm) if rpm else float('inf')
+        self.tpm_capacity = float(tpm) if tpm else float('inf')
+        self._requests = self.rpm_capacity
+        self._tokens = self.tpm_capacity
+        self._last: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last if self._last is not None else 0.0
+        self._last = now
+        self._requests = min(self.rpm_capacity, self._requests + elapsed * self.rpm_capacity / 60)
+        self._tokens = min(self.tpm_capacity, self._tokens + elapsed * self.tpm_capacity / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and `tokens` tokens are available, then consume them."""
+        tokens = min(tokens, self.tpm_capacity)
+        loop = asyncio.get_running_loop()
+        async with self._lock:  # FIFO: waiters are served in arrival order
+            while True:
+                self._refill(loop.time())
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                # Only finite buckets contribute a wait (inf - inf would give nan)
+                waits = [0.0]
+                if self.rpm_capacity != float('inf'):
+                    waits.append((1 - self._requests) * 60 / self.rpm_capacity)
+                if self.tpm_capacity != float('inf'):
+                    waits.append((tokens - self._tokens) * 60 / self.tpm_capacity)
+                await asyncio.sleep(max(waits))
+
+
+class ResponseCache:
+    """Persistent cache of parsed GPT answers in SQLite, keyed by blake2b(model, prompt inputs).
+    Entries expire after ttl seconds; expired rows are purged when the cache is opened.
+    """
+
+    def __init__(self, path: str, ttl: float = 30 * 86400):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+        )
+        self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, property_data: Dict[str, Any]) -> str:
+        # Everything the prompt depends on: its inputs plus the prompt/schema fingerprint
+        text = (f"{_PROMPT_FINGERPRINT}\0{property_data.get('full_text', '')}"
+                f"\0{property_data.get('location', '')}")
+        return blake2b(text.encode('utf-8'), digest_size=16, key=model.encode('utf-8')[:64]).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return _loads_json(row[0]) if row else None
+
+    def set_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store (key, answer) pairs in one transaction, so a batch costs a single commit"""
+        if not items:
+            return
+        expires = time.time() + self.ttl
+        self._db.executemany(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+            [(key, _dumps_jsonl_line(value), expires) for key, value in items]
+        )
+        self._db.commit()
+
+
+class MicroBatcher:
+    """Collects properties from concurrent workers and analyzes them k per call.
+    A partial batch is flushed after `linger` seconds so stragglers never wait for company.
+    """
+
+    def __init__(self, analyze, k: int, linger: float = 0.05):
+        self._analyze = analyze  # async (List[property]) -> List[corrected], same order
+        self.k = k
+        self.linger = linger
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def submit(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((property_data, fut))
+        if len(self._pending) >= self.k:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            results = await self._analyze([p for p, _ in batch])
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+
+
 class PropertyDataCleaner:
     """Agent that cleans and completes property data using OpenAI API."""
     
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
-        """Initialize the cleaning agent with OpenAI API key."""
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini", max_retries: int = 5,
+                 rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 semantic_threshold: Optional[float] = 0.97,
+                 cache_path: Optional[str] = '.cache/gpt_responses.sqlite',
+                 local_base_url: Optional[str] = None, local_model: str = "llama3.1:8b-instruct-q4_K_M",
+                 micro_batch: int = 1):
+        """Initialize the cleaning agent with OpenAI API key.
+        max_retries is handed to the SDK, which retries 429/timeouts/5xx with exponential backoff.
+        rpm/tpm cap requests and tokens per minute; if both are None they are read from the
+        account's rate-limit headers at the start of a run.
+        semantic_threshold: cosine similarity above which a near-duplicate listing reuses an
+        earlier listing's GPT answer (None/0 disables the semantic cache).
+        cache_path: SQLite file caching answers across runs (None disables it).
+        local_base_url: OpenAI-compatible endpoint of a local model (e.g. Ollama at
+        http://localhost:11434/v1) tried before GPT; GPT is only called when its answer fails validation.
+        micro_batch: properties sent together in one GPT call in realtime mode (1 = one per call).
+        """
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=max_retries)
+        self.max_retries = max_retries
         self.model = model
+        # aiohttp session for high-concurrency runs (set only while process_batch runs)
+        self._http_session = None
+        self.rpm = rpm
+        self.tpm = tpm
+        self._limiter: Optional[RateLimiter] = None
+        self._discover_limits = False  # read RPM/TPM from the first GPT response's headers
+        self.semantic_threshold = semantic_threshold
+        self._cache = ResponseCache(cache_path) if cache_path else None
+        self.local_client = (AsyncOpenAI(base_url=local_base_url, api_key="ollama", max_retries=0)
+                             if local_base_url else None)
+        self.local_model = local_model
+        self.local_count = 0  # answers served by the local model
+        self.micro_batch = max(1, micro_batch)
         self.processed_count = 0
         self.errors = []
+        # Progress of the current run: one JSONL file appended per save (see save_progress)
+        self._progress_name: Optional[str] = None
+        self._progress_buffer = bytearray()  # only filled when GCS is configured
+        self._progress_unsent = 0  # records in the buffer not yet uploaded
         # GCS config (defaults can be overridden from main)
         self.gcs_bucket_name: str | None = os.getenv('GCS_BUCKET', 'urbania_scrapper')
         self.gcs_prefix: str = os.getenv('GCS_PREFIX', 'clean_data')
@@ -58,6 +615,20 @@ class PropertyDataCleaner:
         self.cloud_only: bool = str(os.getenv('CLOUD_ONLY', 'false')).lower() in ('1', 'true', 'yes')
         self._gcs_client = None
         self._gcs_bucket = None
+        self._gcs_written: set[str] = set()  # keys this run already created
+
+    def _ensure_gcs_client(self):
+        """Create (once) the storage client shared by input downloads and uploads."""
+        if self._gcs_client is None:
+            if self.gcp_keyfile and Path(self.gcp_keyfile).exists():
+                self._gcs_client = storage.Client.from_service_account_json(self.gcp_keyfile)
+            else:
+                self._gcs_client = storage.Client()
+            # One pooled keep-alive session for every upload/download of the run
+            self._gcs_client._http.mount(
+                "https://", HTTPAdapter(pool_connections=32, pool_maxsize=64)
+            )
+        return self._gcs_client
 
     def setup_gcs(self) -> bool:
         """Initialize GCS client and bucket if library and config are available."""
@@ -67,10 +638,7 @@ class PropertyDataCleaner:
             if storage is None:
                 print("WARNING: google-cloud-storage not installed. Skipping GCS setup.")
                 return False
-            if self.gcp_keyfile and Path(self.gcp_keyfile).exists():
-                self._gcs_client = storage.Client.from_service_account_json(self.gcp_keyfile)
-            else:
-                self._gcs_client = storage.Client()
+            self._ensure_gcs_client()
             self._gcs_bucket = self._gcs_client.bucket(self.gcs_bucket_name)
             _ = self._gcs_bucket.exists()
             print(f"GCS configured: gs://{self.gcs_bucket_name}/{self.gcs_prefix}")
@@ -79,21 +647,34 @@ class PropertyDataCleaner:
             print(f"WARNING: GCS setup failed: {e}")
             return False
 
-    def _gcs_upload_json_string(self, json_text: str, key_name: str) -> bool:
+    def _gcs_upload_json_string(self, json_text: str | bytes | bytearray, key_name: str,
+                                content_type: str = 'application/json; charset=utf-8',
+                                no_clobber: bool = False) -> bool:
+        """Stream the payload to GCS as a chunked resumable upload.
+        With no_clobber, the first write of a key fails if the object already exists.
+        """
         try:
             if not self._gcs_bucket:
                 return False
             key = f"{self.gcs_prefix.rstrip('/')}/{key_name}"
-            blob = self._gcs_bucket.blob(key)
-            blob.upload_from_string(json_text, content_type='application/json; charset=utf-8')
+            blob = self._gcs_bucket.blob(key, chunk_size=GCS_CHUNK_SIZE)
+            data = json_text.encode('utf-8') if isinstance(json_text, str) else memoryview(json_text)
+            # The first write of a per-run key must not clobber an object created by another run
+            precondition = {'if_generation_match': 0} if no_clobber and key not in self._gcs_written else {}
+            with blob.open('wb', content_type=content_type, retry=DEFAULT_RETRY.with_deadline(60),
+                           **precondition) as writer:
+                writer.write(data)
+            self._gcs_written.add(key)
             print(f"Uploaded to gs://{self.gcs_bucket_name}/{key}")
             return True
         except Exception as e:
             print(f"WARNING: GCS upload failed for {key_name}: {e}")
             return False
 
-    def _load_properties_from_source(self, source: str):
-        """Load JSON list/dict from local path or GCS gs://bucket/path URI."""
+    def _load_properties_from_source(self, source: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Load JSON list/dict from local path or GCS gs://bucket/path URI.
+        The file is streamed; with `limit`, parsing stops after that many properties.
+        """
         try:
             if source.startswith('gs://'):
                 if storage is None:
@@ -104,125 +685,174 @@ class PropertyDataCleaner:
                 if len(parts) != 2:
                     raise ValueError(f"Invalid GCS URI: {source}")
                 bkt, key = parts[0], parts[1]
-                # Ensure client
-                client = self._gcs_client
-                if client is None:
-                    if self.gcp_keyfile and Path(self.gcp_keyfile).exists():
-                        client = storage.Client.from_service_account_json(self.gcp_keyfile)
-                    else:
-                        client = storage.Client()
-                bucket = client.bucket(bkt)
-                blob = bucket.blob(key)
-                text = blob.download_as_text()
-                data = json.loads(text)
-            else:
-                with open(source, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            # Normalize to list
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                return [data]
+                client = self._ensure_gcs_client()
+                blob = client.bucket(bkt).get_blob(key)
+                if blob is None:
+                    raise FileNotFoundError(source)
+                if blob.size >= GCS_PARALLEL_MIN_BYTES:
+                    f = io.BytesIO(self._download_gcs_parallel(blob))
+                else:
+                    blob.chunk_size = GCS_CHUNK_SIZE
+                    f = blob.open('rb')
             else:
-                raise ValueError("Input JSON must be a list or object")
+                f = open(source, 'rb')
+            with f:
+                return list(itertools.islice(_iter_json_records(f), limit))
         except Exception as e:
             print(f"Error loading input from {source}: {e}")
             return []
         
-    def create_analysis_prompt(self, property_data: Dict[str, Any]) -> str:
-        """Create a detailed prompt for GPT to analyze property data."""
+    def _download_gcs_parallel(self, blob) -> bytes:
+        """Fetch a large object as parallel ranged GETs (pinned to one generation) and join them."""
+        ranges = [(start, min(start + GCS_RANGE_BYTES, blob.size) - 1)
+                  for start in range(0, blob.size, GCS_RANGE_BYTES)]
+        with ThreadPoolExecutor(max_workers=GCS_RANGE_WORKERS) as ex:
+            parts = list(ex.map(
+                lambda r: blob.download_as_bytes(start=r[0], end=r[1], if_generation_match=blob.generation),
+                ranges
+            ))
+        return b"".join(parts)
         
+    @staticmethod
+    def _prompt_slots(property_data: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Per-property prompt inputs: condensed text, current location, detected districts."""
         full_text = property_data.get('full_text', '')
         current_location = property_data.get('location', '')
         
-        prompt = f"""
-Analiza el siguiente texto de una propiedad inmobiliaria en Lima, Perú y extrae/corrige la información solicitada.
+        # Districts come from the whole text; only a condensed window of it is sent
+        districts = ', '.join(_districts_in(_fold(full_text))) or 'ninguno'
+        return _condense(full_text), current_location, districts
 
-TEXTO DE LA PROPIEDAD:
-{full_text}
+    def create_analysis_prompt(self, property_data: Dict[str, Any]) -> str:
+        """Create a detailed prompt for GPT to analyze property data."""
+        
+        text, current_location, districts = self._prompt_slots(property_data)
+        
+        return ''.join((_PROMPT_HEAD, text, _PROMPT_LOCATION, current_location,
+                        _PROMPT_DISTRICTS, districts, _PROMPT_TAIL))
 
-UBICACIÓN ACTUAL: {current_location}
+    def create_batch_analysis_prompt(self, properties: List[Dict[str, Any]]) -> str:
+        """One prompt for several properties, numbered [1]..[K]."""
+        parts = [_BATCH_PROMPT_HEAD]
+        for n, property_data in enumerate(properties, 1):
+            text, current_location, districts = self._prompt_slots(property_data)
+            parts.append(f"\n[{n}] TEXTO DE LA PROPIEDAD:\n{text}{_PROMPT_LOCATION}{current_location}"
+                         f"{_PROMPT_DISTRICTS}{districts}\n")
+        parts.append(_BATCH_PROMPT_FORMAT.format(k=len(properties)))
+        parts.append(_PROMPT_FIELDS)
+        return ''.join(parts)
 
-DISTRITOS DE LIMA VÁLIDOS:
-{', '.join(LIMA_DISTRICTS)}
+    def _response_format(self, batch: bool = False) -> Dict[str, Any]:
+        """Structured Outputs when the model supports it, JSON mode otherwise."""
+        if self.model.startswith(STRUCTURED_OUTPUT_MODELS):
+            name, schema = ("properties", BATCH_SCHEMA) if batch else ("property", PROP_SCHEMA)
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": True}
+            }
+        return {"type": "json_object"}
 
-Necesito que analices el texto y me proporciones la siguiente información en formato JSON EXACTO:
+    def _chat_request_body(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion parameters for one property (shared by realtime and Batch API modes)."""
+        return {
+            "model": self.model,
+            "messages": [
+                _SYSTEM_MESSAGE,
+                {"role": "user", "content": self.create_analysis_prompt(property_data)}
+            ],
+            "max_tokens": 1000,
+            "temperature": 0.1,
+            "response_format": self._response_format()
+        }
 
-{{
-    "price_raw": "precio como aparece en el texto (ej: 'S/ 250,000', 'USD 180,000', 'Consultar precio') o 'N/A'",
-    "price_numeric": número sin comas ni símbolos o null, si hay precio en dolares y soles, usar el precio en soles. Tipicamente el precio debería estar entre 10 y 40000, si excede, revisa el formato y corrige los errores
-    "property_type": identifica si es casa o departamento (solamente puede tener esos valores),
-    "currency": "PEN", "USD" o "EUR",
-    "has_price": true/false,
-    "location": "distrito específico de Lima encontrado en el texto o 'Lima' si no se especifica",
-    "has_location": true/false,
-    "area_raw": "área como aparece en el texto (ej: '120 m²', '80 m² tot.') o 'N/A'",
-    "area_numeric": número del área en m² o null,
-    "bedrooms": número de dormitorios o null,
-    "bathrooms": número de baños o null,
-    "has_parking": true/false (buscar palabras como 'cochera', 'estacionamiento', 'garage'),
-    "parking_count": número de estacionamientos o 0,
-    "has_pool": true/false (buscar 'piscina', 'pool'),
-    "has_garden": true/false (buscar 'jardín', 'garden', 'área verde'),
-    "has_balcony": true/false (buscar 'balcón', 'balcony'),
-    "has_elevator": true/false (buscar 'ascensor', 'elevator'),
-    "has_security": true/false (buscar 'seguridad', 'security', 'portero', 'vigilancia'),
-    "has_gym": true/false (buscar 'gimnasio', 'gym'),
-    "is_furnished": true/false (buscar 'amoblado', 'furnished', 'amueblado'),
-    "allows_pets": true/false (buscar 'mascotas', 'pets'),
-    "is_new": true/false (buscar 'estreno', 'nuevo', 'new', 'en planos'),
-    "has_terrace": true/false (buscar 'terraza', 'terrace'),
-    "has_laundry": true/false (buscar 'lavandería', 'laundry'),
-    "has_air_conditioning": true/false (buscar 'aire acondicionado', 'A/C', 'AC', 'climatizado')
-    "full_text": texto completo de la propiedad, tal como lo recibiste, no se debe modificar.
-}}
+    def _batch_request_body(self, properties: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Chat completion parameters for a micro-batch of properties."""
+        return {
+            "model": self.model,
+            "messages": [
+                _SYSTEM_MESSAGE,
+                {"role": "user", "content": self.create_batch_analysis_prompt(properties)}
+            ],
+            "max_tokens": 1000 * len(properties),
+            "temperature": 0.1,
+            "response_format": self._response_format(batch=True)
+        }
 
-IMPORTANTE:
-- Para location, usa EXACTAMENTE uno de los distritos de la lista si lo encuentras en el texto
-- Si encuentras "Santa Catalina, La Victoria", el distrito es "La Victoria"
-- Para precios, extrae el número completo (ej: si dice "S/ 250,000" → price_numeric: 250000)
-- Para áreas, extrae solo el número en m² (ej: si dice "120 m²" → area_numeric: 120)
-- Busca sinónimos y variaciones de las características (ej: "cochera" = parking)
-- Si no encuentras información específica, usa null para números y false para booleanos
+    def _parse_gpt_content(self, content: str, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a JSON-mode GPT reply; returns property_data if it is not valid JSON
+        (e.g. the reply was cut off at max_tokens).
+        """
+        try:
+            return _loads_json(content)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON response: {e}")
+            print(f"Response content: {content}")
+            return property_data  # Return original if parsing fails
 
-Responde SOLO con el JSON, sin explicaciones adicionales.
-"""
-        return prompt
+    async def _raw_chat(self, body: Dict[str, Any]) -> str:
+        """POST a chat completion through the aiohttp session; returns the reply content.
+        Retries 429/5xx and connection errors with exponential backoff (honors Retry-After).
+        """
+        url = f"{str(self.client.base_url).rstrip('/')}/chat/completions"
+        headers = {"Authorization": f"Bearer {self.client.api_key}"}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._http_session.post(url, json=body, headers=headers) as resp:
+                    if resp.status != 429 and resp.status < 500:
+                        resp.raise_for_status()
+                        if self._discover_limits:
+                            self._adopt_rate_limits(resp.headers)
+                        data = _loads_json(await resp.read())  # bytes straight to orjson, no str decode
+                        return data["choices"][0]["message"]["content"]
+                    retry_after = resp.headers.get("Retry-After")
+                    if attempt == self.max_retries:
+                        resp.raise_for_status()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            try:
+                wait = float(retry_after)
+            except (TypeError, ValueError):
+                wait = min(0.5 * 2 ** attempt, 8.0)
+            await asyncio.sleep(wait)
+        raise RuntimeError("unreachable")
 
-    def analyze_property_with_gpt(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Use GPT to analyze and correct property data."""
-        
+    async def _analyze_locally(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Ask the local model first; None if it errors or its answer fails validation."""
         try:
-            prompt = self.create_analysis_prompt(property_data)
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un experto analista de datos inmobiliarios. Analiza textos de propiedades y extrae información estructurada con precisión."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.1
+            response = await self.local_client.chat.completions.create(
+                **{**body, "model": self.local_model, "response_format": {"type": "json_object"}}
             )
+            answer = _loads_json(response.choices[0].message.content)
+        except Exception:
+            return None
+        if not _valid_answer(answer):
+            return None
+        self.local_count += 1
+        return answer
+
+    async def _complete(self, body: Dict[str, Any]) -> str:
+        """Send one rate-limited chat completion (aiohttp or SDK); returns the reply content."""
+        if self._limiter is not None:
+            await self._limiter.acquire(_estimate_tokens(body))
+        if self._http_session is not None:
+            return await self._raw_chat(body)
+        if self._discover_limits:
+            raw = await self.client.chat.completions.with_raw_response.create(**body)
+            self._adopt_rate_limits(raw.headers)
+            response = raw.parse()
+        else:
+            response = await self.client.chat.completions.create(**body)
+        return response.choices[0].message.content
+
+    async def _gpt_single(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """One GPT call for one property; returns property_data itself on failure."""
+        try:
+            content = await self._complete(self._chat_request_body(property_data))
             
             # Extract JSON from response
-            content = response.choices[0].message.content.strip()
-            
-            # Try to parse JSON from response
-            try:
-                # Clean the response to extract JSON
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    corrected_data = json.loads(json_match.group())
-                else:
-                    raise ValueError("No JSON found in response")
-                    
-            except json.JSONDecodeError as e:
-                print(f"Error parsing JSON response: {e}")
-                print(f"Response content: {content}")
-                return property_data  # Return original if parsing fails
-            
-            return corrected_data
+            return self._parse_gpt_content(content, property_data)
             
         except Exception as e:
             error_msg = f"Error analyzing property {property_data.get('index', 'unknown')}: {str(e)}"
@@ -230,137 +860,466 @@ Responde SOLO con el JSON, sin explicaciones adicionales.
             self.errors.append(error_msg)
             return property_data  # Return original data if API call fails
 
+    async def _gpt_batch(self, properties: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """One GPT call for several properties; None if the answer can't be mapped back by position."""
+        try:
+            answer = _loads_json(await self._complete(self._batch_request_body(properties)))
+        except Exception as e:
+            print(f"Micro-batch of {len(properties)} failed ({e}); analyzing one by one")
+            return None
+        items = answer.get('propiedades') if isinstance(answer, dict) else None
+        if not isinstance(items, list) or len(items) != len(properties) \
+                or not all(isinstance(item, dict) for item in items):
+            print(f"Micro-batch answer did not match its {len(properties)} properties; analyzing one by one")
+            return None
+        return items
+
+    async def analyze_properties_batch(self, properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyze several properties, sharing one GPT call among those that need it.
+        Order: disk cache, local model, one micro-batch call, then single calls for leftovers.
+        Failed properties come back as the original dict (same object).
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(properties)
+        keys = None
+        if self._cache is not None:
+            keys = [ResponseCache.key(self.model, p) for p in properties]
+            results = [self._cache.get(k) for k in keys]
+        from_cache = [r is not None for r in results]
+        from_local = [False] * len(properties)
+        
+        if self.local_client is not None:
+            todo = [i for i, r in enumerate(results) if r is None]
+            answers = await asyncio.gather(
+                *(self._analyze_locally(self._chat_request_body(properties[i])) for i in todo)
+            )
+            for i, answer in zip(todo, answers):
+                results[i] = answer
+                from_local[i] = answer is not None
+        
+        todo = [i for i, r in enumerate(results) if r is None]
+        if len(todo) > 1:
+            answers = await self._gpt_batch([properties[i] for i in todo])
+            if answers is not None:
+                for i, answer in zip(todo, answers):
+                    results[i] = answer
+        
+        todo = [i for i, r in enumerate(results) if r is None]
+        answers = await asyncio.gather(*(self._gpt_single(properties[i]) for i in todo))
+        for i, answer in zip(todo, answers):
+            results[i] = answer
+        
+        if keys is not None:
+            # Only GPT answers are cached under the GPT model's key; local ones are redone next run
+            self._cache.set_many([
+                (key, answer)
+                for key, cached, local, prop, answer in zip(keys, from_cache, from_local, properties, results)
+                if not cached and not local and answer is not prop
+            ])
+        return results
+
+    async def analyze_property_with_gpt(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Use GPT to analyze and correct property data."""
+        return (await self.analyze_properties_batch([property_data]))[0]
+
     def update_property_data(self, original: Dict[str, Any], corrected: Dict[str, Any]) -> Dict[str, Any]:
-        """Update original property data with corrected information."""
+        """Update original property data with corrected information.
+        data_completeness/feature_count are filled in by update_batch_metrics over a whole batch.
+        """
         
         # Keep all original fields
         updated = original.copy()
         
         # Update with corrected data
-        fields_to_update = [
-            'price_raw', 'price_numeric', 'currency', 'has_price',
-            'location', 'has_location', 'area_raw', 'area_numeric',
-            'bedrooms', 'bathrooms', 'has_parking', 'parking_count',
-            'has_pool', 'has_garden', 'has_balcony', 'has_elevator',
-            'has_security', 'has_gym', 'is_furnished', 'allows_pets',
-            'is_new', 'has_terrace', 'has_laundry', 'has_air_conditioning'
-        ]
-        
-        for field in fields_to_update:
+        for field in FIELDS_TO_UPDATE:
             if field in corrected and corrected[field] is not None:
                 updated[field] = corrected[field]
         
-        # Recalculate data completeness
-        total_fields = len(fields_to_update)
-        complete_fields = sum(1 for field in fields_to_update 
-                            if updated.get(field) not in [None, "N/A", "", False])
-        updated['data_completeness'] = (complete_fields / total_fields) * 100
+        # Flags derived from the values rather than asked from the model
+        updated['has_price'] = updated.get('price_numeric') is not None
+        updated['has_location'] = updated.get('location') not in EMPTY_VALUES
         
-        # Recalculate feature count (boolean features that are True)
-        boolean_features = [
-            'has_parking', 'has_pool', 'has_garden', 'has_balcony',
-            'has_elevator', 'has_security', 'has_gym', 'is_furnished',
-            'allows_pets', 'is_new', 'has_terrace', 'has_laundry',
-            'has_air_conditioning'
-        ]
-        updated['feature_count'] = sum(1 for feature in boolean_features 
-                                     if updated.get(feature, False))
+        # Amenities are additive: a keyword hit in the text wins over a missed flag
+        for field, present in _extract_booleans(_fold(original.get('full_text') or '')).items():
+            if present:
+                updated[field] = True
+        if updated.get('has_parking') and not updated.get('parking_count'):
+            updated['parking_count'] = 1
         
         return updated
 
+    def update_batch_metrics(self, properties: List[Dict[str, Any]]) -> None:
+        """Recalculate data_completeness and feature_count in place for a batch of properties."""
+        if not properties:
+            return
+        # (batch, n_fields) presence matrix and (batch, n_features) truthiness matrix,
+        # filled straight from generators (no per-row Python lists)
+        n = len(properties)
+        filled = np.fromiter(
+            (p.get(f) not in EMPTY_VALUES for p in properties for f in FIELDS_TO_UPDATE),
+            dtype=bool, count=n * len(FIELDS_TO_UPDATE)
+        ).reshape(n, len(FIELDS_TO_UPDATE))
+        features = np.fromiter(
+            (bool(p.get(f, False)) for p in properties for f in BOOLEAN_FEATURES),
+            dtype=bool, count=n * len(BOOLEAN_FEATURES)
+        ).reshape(n, len(BOOLEAN_FEATURES))
+        completeness = (filled.sum(axis=1) / len(FIELDS_TO_UPDATE)) * 100
+        feature_counts = features.sum(axis=1)
+        for prop, pct, count in zip(properties, completeness.tolist(), feature_counts.tolist()):
+            prop['data_completeness'] = pct
+            prop['feature_count'] = count
+
+    def _adopt_rate_limits(self, headers) -> None:
+        """Build the limiter from the account's RPM/TPM in a real response's rate-limit headers.
+        Whichever header is present is used; if neither is, requests rely on retries only.
+        """
+        self._discover_limits = False
+        limits = []
+        for name in ('x-ratelimit-limit-requests', 'x-ratelimit-limit-tokens'):
+            try:
+                limits.append(float(headers.get(name)))
+            except (TypeError, ValueError):
+                limits.append(None)
+        rpm, tpm = limits
+        if rpm is None and tpm is None:
+            print("No rate-limit headers in GPT response; relying on retries only")
+            return
+        print("Discovered rate limits: " + ", ".join(
+            f"{limit:.0f} {unit}" for limit, unit in ((rpm, 'RPM'), (tpm, 'TPM')) if limit is not None))
+        self._limiter = RateLimiter(rpm, tpm)
+
+    async def _semantic_leaders(self, properties: List[Dict[str, Any]]) -> List[int]:
+        """For each property, the position of an earlier property with a near-identical
+        full_text embedding (cosine >= semantic_threshold), or its own position if none.
+        """
+        leaders = list(range(len(properties)))
+        positions = [i for i, p in enumerate(properties)
+                     if (p.get('full_text') or '').strip() and not _already_complete(p)]
+        if self._cache is not None:
+            # Exact cache hits need no embedding
+            positions = [i for i in positions
+                         if self._cache.get(ResponseCache.key(self.model, properties[i])) is None]
+        if not self.semantic_threshold or len(positions) < 2:
+            return leaders
+        try:
+            vectors = []
+            for k in range(0, len(positions), EMBEDDING_BATCH):
+                resp = await self.client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    dimensions=EMBEDDING_DIMS,
+                    input=[properties[i]['full_text'][:8000] for i in positions[k:k + EMBEDDING_BATCH]]
+                )
+                vectors.extend(d.embedding for d in resp.data)
+        except Exception as e:
+            print(f"Semantic cache disabled (embedding failed: {e})")
+            return leaders
+        emb = np.asarray(vectors, dtype=np.float32)
+        emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+        # Blocked similarity search against earlier rows only; first match wins
+        block = 256
+        for start in range(0, len(positions), block):
+            stop = min(start + block, len(positions))
+            sims = emb[start:stop] @ emb[:stop].T
+            sims[np.triu_indices(stop - start, k=start, m=stop)] = -1.0  # j >= i
+            hit = sims >= self.semantic_threshold
+            first = hit.argmax(axis=1)
+            for r in np.flatnonzero(hit.any(axis=1)):
+                row = start + r
+                leaders[positions[row]] = leaders[positions[first[r]]]
+        hits = sum(1 for i, l in enumerate(leaders) if i != l)
+        if hits:
+            print(f"Semantic cache: {hits} near-duplicate properties will reuse earlier answers")
+        return leaders
+
     def process_batch(self, properties: List[Dict[str, Any]], 
                      start_index: int = 0, batch_size: int = 10,
-                     delay: float = 1.0) -> List[Dict[str, Any]]:
-        """Process a batch of properties with rate limiting."""
-        
-        cleaned_properties = []
-        total = len(properties)
-        
-        for i, property_data in enumerate(properties[start_index:], start_index):
+                     concurrency: int = 10) -> List[Dict[str, Any]]:
+        """Process a batch of properties with up to `concurrency` GPT calls in flight.
+        Request starts are paced by a RPM/TPM token bucket.
+        Results keep input order; progress is saved every batch_size properties.
+        """
+        return asyncio.run(
+            self._process_batch_async(properties, start_index, batch_size, concurrency)
+        )
+
+    async def _process_batch_async(self, properties: List[Dict[str, Any]],
+                                   start_index: int, batch_size: int,
+                                   concurrency: int) -> List[Dict[str, Any]]:
+        rpm, tpm = self.rpm, self.tpm
+        # Without configured limits, the first GPT response's headers supply them (no probe call)
+        self._discover_limits = rpm is None and tpm is None
+        self._limiter = RateLimiter(rpm, tpm) if (rpm or tpm) else None
+        # httpx.AsyncClient (used by the SDK) degrades at high concurrency; aiohttp's pool doesn't
+        if aiohttp is None or concurrency < AIOHTTP_MIN_CONCURRENCY:
+            return await self._run_batch(properties, start_index, batch_size, concurrency)
+        connector = aiohttp.TCPConnector(limit=max(concurrency, 100), ttl_dns_cache=300)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60),
+            json_serialize=lambda obj: _dumps_jsonl_line(obj).decode('utf-8')
+        ) as session:
+            self._http_session = session
             try:
-                print(f"Processing property {i+1}/{total} (Index: {property_data.get('index', 'N/A')})")
+                return await self._run_batch(properties, start_index, batch_size, concurrency)
+            finally:
+                self._http_session = None
+
+    async def _run_batch(self, properties: List[Dict[str, Any]],
+                         start_index: int, batch_size: int,
+                         concurrency: int) -> List[Dict[str, Any]]:
+        total = len(properties)
+        todo = properties[start_index:]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(todo)
+        pending_metrics = []  # updated since the last metrics pass
+        saved = 0  # results[:saved] are already in the progress file
+        self._progress_name = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        self._progress_buffer = bytearray()
+        self._progress_unsent = 0
+        # concurrency counts GPT calls; with micro-batching each call carries micro_batch properties
+        sem = asyncio.Semaphore(max(1, concurrency) * self.micro_batch)
+        batcher = (MicroBatcher(self.analyze_properties_batch, self.micro_batch)
+                   if self.micro_batch > 1 else None)
+        leaders = await self._semantic_leaders(todo)
+        loop = asyncio.get_running_loop()
+        # GPT answer of every property that near-duplicates later ones (None if it failed)
+        answers = {l: loop.create_future() for i, l in enumerate(leaders) if i != l}
+
+        async def run(pos: int, property_data: Dict[str, Any]):
+            i = start_index + pos
+            corrected_data = None
+            text = property_data.get('full_text') or ''
+            if _already_complete(property_data):
+                print(f"Property {i+1}/{total}: already complete, skipping")
+                return pos, property_data, False
+            local = _local_extract(text) if text.strip() else {}
+            if _local_complete(local):
+                corrected_data = local
+            elif leaders[pos] != pos:
+                # Wait outside the semaphore so followers never hold a slot their leader needs
+                corrected_data = await answers[leaders[pos]]
+            async with sem:
+                try:
+                    print(f"Processing property {i+1}/{total} (Index: {property_data.get('index', 'N/A')})")
+                    
+                    # Skip if no full_text or empty
+                    if not property_data.get('full_text', '').strip():
+                        print(f"  Skipping - no full_text content")
+                        return pos, property_data, False
+                    
+                    if corrected_data is local:
+                        print(f"  Extracted locally (regex), skipping GPT")
+                        if pos in answers:
+                            answers[pos].set_result(local)
+                    elif corrected_data is not None:
+                        print(f"  Semantic cache hit (same listing as {start_index + leaders[pos] + 1})")
+                    else:
+                        # Analyze with GPT
+                        if batcher is not None:
+                            corrected_data = await batcher.submit(property_data)
+                        else:
+                            corrected_data = await self.analyze_property_with_gpt(property_data)
+                        if pos in answers:
+                            ok = corrected_data is not property_data
+                            answers[pos].set_result(corrected_data if ok else None)
+                    
+                    # Update property with corrected data
+                    updated_property = self.update_property_data(property_data, corrected_data)
+                    self.processed_count += 1
+                    return pos, updated_property, True
                 
-                # Skip if no full_text or empty
-                if not property_data.get('full_text', '').strip():
-                    print(f"  Skipping - no full_text content")
-                    cleaned_properties.append(property_data)
+                except Exception as e:
+                    error_msg = f"Error processing property {i}: {str(e)}"
+                    print(error_msg)
+                    self.errors.append(error_msg)
+                    return pos, property_data, False  # Keep original on error
+                finally:
+                    if pos in answers and not answers[pos].done():
+                        answers[pos].set_result(None)
+
+        tasks = [asyncio.create_task(run(pos, p)) for pos, p in enumerate(todo)]
+        done = 0  # length of the completed, in-order prefix
+        for next_done in asyncio.as_completed(tasks):
+            pos, prop, updated = await next_done
+            results[pos] = prop
+            if updated:
+                pending_metrics.append(prop)
+            prev_done = done
+            while done < len(results) and results[done] is not None:
+                done += 1
+            # Save progress periodically (whenever the ordered prefix crosses a batch boundary)
+            if (start_index + done) // batch_size > (start_index + prev_done) // batch_size:
+                self.update_batch_metrics(pending_metrics)
+                pending_metrics.clear()
+                # Off the event loop so in-flight requests keep going during disk/GCS writes
+                await asyncio.to_thread(self.save_progress, results[saved:done], start_index + done)
+                saved = done
+        
+        self.update_batch_metrics(pending_metrics)
+        # Write the tail past the last batch boundary and flush the GCS copy
+        await asyncio.to_thread(self.save_progress, results[saved:], start_index + len(results), True)
+        return results
+
+    async def submit_batch(self, properties: List[Dict[str, Any]]) -> Optional[str]:
+        """Upload one JSONL request per property to the OpenAI Batch API and start the batch.
+        custom_id is the property's position in `properties`. Returns the batch id, or None
+        if no property has full_text (or all are already complete).
+        """
+        lines = [
+            _dumps_jsonl_line({
+                "custom_id": str(pos),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._chat_request_body(prop)
+            })
+            for pos, prop in enumerate(properties)
+            if prop.get('full_text', '').strip() and not _already_complete(prop)
+        ]
+        if not lines:
+            return None
+        batch_file = await self.client.files.create(
+            file=("cleaning_batch.jsonl", b"".join(lines)), purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"Batch submitted: {batch.id} ({len(lines)} requests)")
+        return batch.id
+
+    async def poll_batch(self, batch_id: str, poll_interval: float = 60.0) -> Dict[str, str]:
+        """Wait for a batch to complete and return {custom_id: GPT reply content}."""
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status: {batch.status}")
+            print(f"  Batch {batch_id} status: {batch.status}; checking again in {poll_interval:.0f}s")
+            await asyncio.sleep(poll_interval)
+        
+        contents: Dict[str, str] = {}
+        if batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            for line in output.content.splitlines():
+                if not line.strip():
                     continue
-                
-                # Analyze with GPT
-                corrected_data = self.analyze_property_with_gpt(property_data)
-                
-                # Update property with corrected data
+                item = _loads_json(line)
+                response = item.get("response") or {}
+                if response.get("status_code") != 200:
+                    self.errors.append(f"Batch request {item.get('custom_id')} failed: {item.get('error') or response}")
+                    continue
+                contents[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        return contents
+
+    def process_batch_api(self, properties: List[Dict[str, Any]], start_index: int = 0,
+                          poll_interval: float = 60.0) -> List[Dict[str, Any]]:
+        """Offline alternative to process_batch: one OpenAI Batch API job for all properties.
+        Cheaper per request, but results arrive within the 24h completion window.
+        """
+        return asyncio.run(self._process_batch_api_async(properties, start_index, poll_interval))
+
+    async def _process_batch_api_async(self, properties: List[Dict[str, Any]], start_index: int,
+                                       poll_interval: float) -> List[Dict[str, Any]]:
+        todo = properties[start_index:]
+        batch_id = await self.submit_batch(todo)
+        if batch_id is None:
+            print("No properties with full_text to submit.")
+            return list(todo)
+        contents = await self.poll_batch(batch_id, poll_interval)
+        
+        cleaned_properties = []
+        updated_properties = []
+        for pos, property_data in enumerate(todo):
+            content = contents.get(str(pos))
+            if content is None:
+                cleaned_properties.append(property_data)  # Skipped or failed request
+                continue
+            try:
+                corrected_data = self._parse_gpt_content(content, property_data)
                 updated_property = self.update_property_data(property_data, corrected_data)
                 cleaned_properties.append(updated_property)
-                
+                updated_properties.append(updated_property)
                 self.processed_count += 1
-                
-                # Rate limiting
-                if delay > 0:
-                    time.sleep(delay)
-                
-                # Save progress periodically
-                if (i + 1) % batch_size == 0:
-                    self.save_progress(cleaned_properties, i + 1)
-                    
             except Exception as e:
-                error_msg = f"Error processing property {i}: {str(e)}"
+                error_msg = f"Error processing property {start_index + pos}: {str(e)}"
                 print(error_msg)
                 self.errors.append(error_msg)
                 cleaned_properties.append(property_data)  # Keep original on error
         
+        self.update_batch_metrics(updated_properties)
         return cleaned_properties
 
-    def save_progress(self, properties: List[Dict[str, Any]], processed_count: int):
-        """Save progress to a temporary file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"cleaned_data/cleaned_data_progress_{timestamp}_batch_{processed_count}.json"
+    def save_progress(self, properties: List[Dict[str, Any]], processed_count: int,
+                      final: bool = False):
+        """Append the properties finished since the last save to this run's JSONL progress file.
+        Only the delta is serialized. The GCS copy is re-uploaded from an in-memory buffer every
+        GCS_PROGRESS_EVERY records and on the final save.
+        """
+        if self._progress_name is None:
+            self._progress_name = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        filename = f"cleaned_data/{self._progress_name}"
         
         try:
-            # Build JSON once
-            json_text = json.dumps(properties, ensure_ascii=False, indent=2)
+            chunk = b"".join(_dumps_jsonl_line(p) for p in properties)
             # Local save (unless cloud-only)
-            if not self.cloud_only:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(json_text)
-                print(f"  Progress saved: {filename}")
+            if chunk and not self.cloud_only:
+                with open(filename, 'ab') as f:
+                    f.write(chunk)
+                print(f"  Progress saved: {filename} ({processed_count} properties)")
             # GCS upload under progress/
-            gcs_name = f"progress/cleaned_data_progress_{timestamp}_batch_{processed_count}.json"
-            self._gcs_upload_json_string(json_text, gcs_name)
+            if self._gcs_bucket is None:
+                return
+            self._progress_buffer += chunk
+            self._progress_unsent += len(properties)
+            if self._progress_unsent >= GCS_PROGRESS_EVERY or (final and self._progress_unsent):
+                self._gcs_upload_json_string(
+                    self._progress_buffer, f"progress/{self._progress_name}",
+                    content_type='application/x-ndjson', no_clobber=True
+                )
+                self._progress_unsent = 0
         except Exception as e:
             print(f"  Error saving progress: {e}")
 
     def clean_data(self, input_file: str, output_file: str = None, 
                    start_index: int = 0, max_properties: int = None,
-                   batch_size: int = 10, delay: float = 1.0):
-        """Main method to clean the property data."""
+                   batch_size: int = 10, concurrency: int = 10,
+                   mode: str = "realtime"):
+        """Main method to clean the property data.
+        mode="batch" submits everything as one OpenAI Batch API job instead of realtime calls.
+        """
         
         print(f"=== Data Cleaning Agent Started ===")
         print(f"Input file: {input_file}")
         print(f"Model: {self.model}")
+        print(f"Mode: {mode}")
         print(f"Start index: {start_index}")
         print(f"Max properties: {max_properties or 'All'}")
         print(f"Batch size: {batch_size}")
-        print(f"Delay: {delay}s")
+        print(f"Concurrency: {concurrency}")
         print(f"=================================")
         
         # Load data (supports local path or gs:// URI)
-        properties = self._load_properties_from_source(input_file)
+        # Limit properties if specified (parsing stops once the limit is reached)
+        properties = self._load_properties_from_source(input_file, max_properties or None)
         if not properties:
             print("No input properties loaded. Aborting.")
             return
         print(f"Loaded {len(properties)} properties from {input_file}")
-        
-        # Limit properties if specified
-        if max_properties:
-            properties = properties[:max_properties]
+        if max_properties and len(properties) == max_properties:
             print(f"Limited to first {max_properties} properties")
         
         # Process properties
         start_time = time.time()
-        cleaned_properties = self.process_batch(
-            properties, start_index, batch_size, delay
-        )
+        if mode == "batch":
+            try:
+                cleaned_properties = self.process_batch_api(properties, start_index)
+            except Exception as e:
+                print(f"Batch API run failed: {e}")
+                return
+        else:
+            cleaned_properties = self.process_batch(
+                properties, start_index, batch_size, concurrency
+            )
         end_time = time.time()
         
         # Generate output filename if not provided
@@ -370,9 +1329,9 @@ Responde SOLO con el JSON, sin explicaciones adicionales.
         
         # Save results (local optional) and upload to GCS
         try:
-            json_text = json.dumps(cleaned_properties, ensure_ascii=False, indent=2)
+            json_text = _dumps_json(cleaned_properties)
             if not self.cloud_only:
-                with open(output_file, 'w', encoding='utf-8') as f:
+                with open(output_file, 'wb') as f:
                     f.write(json_text)
                 print(f"Results saved to: {output_file}")
             # Upload to GCS at root prefix
@@ -385,6 +1344,8 @@ Responde SOLO con el JSON, sin explicaciones adicionales.
         print(f"\n=== Cleaning Summary ===")
         print(f"Total properties: {len(properties)}")
         print(f"Successfully processed: {self.processed_count}")
+        if self.local_client is not None:
+            print(f"Answered by local model: {self.local_count}")
         print(f"Errors: {len(self.errors)}")
         print(f"Processing time: {end_time - start_time:.2f} seconds")
         print(f"Output file: {output_file}")
@@ -400,6 +1361,11 @@ Responde SOLO con el JSON, sin explicaciones adicionales.
 def main():
     """Main function to run the data cleaning agent."""
     
+    parser = argparse.ArgumentParser(description='Urbania Data Cleaning Agent')
+    parser.add_argument('--mode', choices=['realtime', 'batch'], default=os.getenv('CLEANING_MODE', 'realtime'),
+                        help='realtime: concurrent API calls; batch: one OpenAI Batch API job (cheaper, up to 24h)')
+    args = parser.parse_args()
+    
     # Configuration
     API_KEY = os.getenv('OPENAI_API_KEY')
     if not API_KEY:
@@ -414,19 +1380,30 @@ def main():
         print("   OPENAI_API_KEY='your_api_key_here' python data_cleaning_agent.py")
         return
     
-    MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+    MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '3'))  # SDK backoff on 429/timeouts
+    # Rate limits for the token bucket; if neither is set they are auto-discovered
+    RPM = float(os.getenv('OPENAI_RPM')) if os.getenv('OPENAI_RPM') else None
+    TPM = float(os.getenv('OPENAI_TPM')) if os.getenv('OPENAI_TPM') else None
+    SEMANTIC_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.97'))  # 0 disables
+    CACHE_PATH = os.getenv('GPT_CACHE_PATH', '.cache/gpt_responses.sqlite') or None  # empty disables
     # Input can be local path or GCS URI (gs://bucket/path). If INPUT_GCS_URI is set, it overrides.
     INPUT_FILE = os.getenv('INPUT_GCS_URI') or os.getenv('INPUT_FILE', "urbania_minimal_results_20250920_190749.json")
     
     # Initialize cleaning agent
-    cleaner = PropertyDataCleaner(api_key=API_KEY, model=MODEL)
+    cleaner = PropertyDataCleaner(api_key=API_KEY, model=MODEL, max_retries=MAX_RETRIES,
+                                  rpm=RPM, tpm=TPM, semantic_threshold=SEMANTIC_THRESHOLD,
+                                  cache_path=CACHE_PATH,
+                                  local_base_url=os.getenv('LOCAL_LLM_BASE_URL'),  # e.g. http://localhost:11434/v1
+                                  local_model=os.getenv('LOCAL_LLM_MODEL', 'llama3.1:8b-instruct-q4_K_M'),
+                                  micro_batch=int(os.getenv('OPENAI_MICRO_BATCH', '5')))  # properties per GPT call
     cleaner.setup_gcs()
     
     # Configuration for testing - start with a small batch
     START_INDEX = 0
     MAX_PROPERTIES = 100000  # Start with 20 properties for testing
     BATCH_SIZE = 5
-    DELAY = 1.0  # 1 second delay between API calls to avoid rate limits
+    CONCURRENCY = int(os.getenv('OPENAI_CONCURRENCY', '20'))  # GPT requests in flight at once
     
     print("Starting with a test batch of 20 properties...")
     print("You can modify MAX_PROPERTIES in the script to process more data.")
@@ -437,7 +1414,8 @@ def main():
         start_index=START_INDEX,
         max_properties=MAX_PROPERTIES,
         batch_size=BATCH_SIZE,
-        delay=DELAY
+        concurrency=CONCURRENCY,
+        mode=args.mode
     )
 
 
@@ -0,0 +1,36 @@
+"""_vec_parse_amount must agree with the scalar parse_amount it replaces."""
+import math
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaning_to_parquet_agent import _vec_parse_amount, parse_amount
+
+EDGE_STRINGS = [
+    None, "", "None", "nan", "inf", "-Infinity", "abc", "+", "-", "1.2.3", "--1", "0x10",
+    "1500", " 12 ", "+5", ".5", "5.", "1e3", "1E-2", "1 000",
+    "9,990", "1,2", "190,000", "1,400,000", "1234,567,890", "1,5e3",
+    "1_000", "_1000", "1__000", "1,000_000", "12,3_4",
+    "١٢٣", "١٢٣,٤٥٦", "120m²,5",
+]
+
+
+class VecParseAmountTest(unittest.TestCase):
+
+    def test_matches_scalar_parse_amount(self):
+        vec = _vec_parse_amount(pd.Series(EDGE_STRINGS, dtype=object)).tolist()
+        for value, got in zip(EDGE_STRINGS, vec):
+            expected = parse_amount(value)
+            with self.subTest(value=value):
+                if expected is None or math.isnan(expected):
+                    self.assertTrue(math.isnan(got), got)
+                else:
+                    self.assertEqual(got, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""The polars engine must clean and dedup exactly like the pandas path."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaning_to_parquet_agent import (
+    apply_notebook_cleaning_rules, clean_and_dedup_polars, deduplicate_df, normalize_records, pl
+)
+
+RECORDS = [
+    {"url": "https://urbania.pe/a", "scraped_at": "2024-01-03T10:00:00.500000",
+     "price_raw": "S/ 1,500 · USD 400", "area_numeric": 50, "full_text": "a",
+     "image_urls": ["https://img/2.jpg", "https://img/1.jpg", "https://img/2.jpg"]},
+    {"url": "https://urbania.pe/a", "scraped_at": "2024-01-01T10:00:00",
+     "price_raw": "S/ 1,600", "area_numeric": 50, "full_text": "a2"},
+    {"url": "https://urbania.pe/b", "scraped_at": "2024-01-02T10:00:00",
+     "price_raw": "USD 1,200", "area_numeric": 0, "full_text": "b"},
+    # Leading text: not a URL for either engine, so deduped with the URL-less rows
+    {"url": "ver https://urbania.pe/c", "scraped_at": "2024-01-02T11:00:00",
+     "price_raw": "S/ 2,000", "full_text": "same  text"},
+    {"url": "ver https://urbania.pe/c", "scraped_at": "2024-01-02T12:00:00",
+     "price_raw": "S/ 2,100", "full_text": "other text"},
+    {"url": None, "scraped_at": "2024-01-01T09:00:00",
+     "price_raw": "S/ 2,000", "full_text": "same text"},
+    {"url": None, "scraped_at": None, "price_raw": "S/ 1,400,000", "full_text": "x"},
+    {"url": None, "scraped_at": "2024-01-05T09:00:00", "price_raw": "S/ 5", "full_text": "cheap"},
+]
+
+
+@unittest.skipUnless(pl, "polars not installed")
+class PolarsEngineEquivalenceTest(unittest.TestCase):
+
+    def assertSameRows(self, records):
+        expected = deduplicate_df(apply_notebook_cleaning_rules(normalize_records(records)))
+        actual = clean_and_dedup_polars(normalize_records(records))
+        cols = ["url", "scraped_at", "price_numeric", "currency", "full_text"]
+        self.assertEqual(
+            actual[cols].astype(object).where(actual[cols].notna(), None).values.tolist(),
+            expected[cols].astype(object).where(expected[cols].notna(), None).values.tolist(),
+        )
+
+    def test_matches_pandas_path(self):
+        self.assertSameRows(RECORDS)
+
+    def test_without_image_urls(self):
+        self.assertSameRows([{k: v for k, v in r.items() if k != "image_urls"} for r in RECORDS])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""RateLimiter with only one of the two limits configured."""
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_cleaning_agent import RateLimiter
+
+
+class RateLimiterSingleLimitTest(unittest.TestCase):
+
+    def test_tpm_only_waits_for_tokens(self):
+        async def run():
+            limiter = RateLimiter(rpm=None, tpm=6000)  # 100 tokens/s, no request limit
+            await limiter.acquire(6000)
+            # Bucket is empty: the next call must wait ~0.1 s, not hang
+            await asyncio.wait_for(limiter.acquire(10), timeout=2)
+        asyncio.run(run())
+
+    def test_rpm_only_waits_for_requests(self):
+        async def run():
+            limiter = RateLimiter(rpm=600, tpm=None)  # 10 requests/s, no token limit
+            for _ in range(600):
+                await limiter.acquire(1000)
+            await asyncio.wait_for(limiter.acquire(1000), timeout=2)
+        asyncio.run(run())
+
+    def test_no_limits_never_blocks(self):
+        async def run():
+            limiter = RateLimiter(rpm=None, tpm=None)
+            for _ in range(100):
+                await asyncio.wait_for(limiter.acquire(10 ** 6), timeout=1)
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
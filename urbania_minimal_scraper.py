@@ -15,7 +15,9 @@ import time
 import random
 import json
 import csv
+import gzip
 import re
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import undetected_chromedriver as uc
@@ -26,14 +28,36 @@ from selenium.webdriver.support import expected_conditions as EC
 import os
 from urllib.parse import urlparse, unquote
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import argparse
+import asyncio
+import operator
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
+from functools import lru_cache
 
 try:
     from google.cloud import storage
 except Exception:
     storage = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+    import h2  # noqa: F401  (required by httpx for http2=True)
+except ImportError:
+    httpx = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,6 +68,268 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+# httpx logs every image request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Selector of a property card; its presence means the listing has rendered
+CARD_SELECTOR = 'div[class*="postingsList-module__card-container"]'
+
+# True while the Cloudflare interstitial is showing (challenge form or its title)
+CHALLENGE_JS = (
+    "return !!document.querySelector('#challenge-form, #challenge-stage, .cf-challenge')"
+    " || /just a moment|cloudflare/i.test(document.title);"
+)
+
+# Selectors tried (in order) to find property elements
+CARD_SELECTORS = [
+    CARD_SELECTOR,
+    'div[class*="card-container"]',
+    'div[class*="posting-card"]',
+    'div[class*="property"]',
+    'div[class*="listing"]',
+    'article'
+]
+
+# Requests the text-only scraper never needs (CDP Network.setBlockedURLs patterns)
+BLOCKED_URL_PATTERNS = [
+    '*.woff', '*.woff2', '*.ttf', '*.mp4', '*.webm',
+    '*google-analytics*', '*googletagmanager*', '*doubleclick*', '*facebook.net*', '*hotjar*'
+]
+BLOCKED_IMAGE_PATTERNS = ['*.jpg', '*.jpeg', '*.png', '*.webp', '*.gif', '*.svg']
+
+# Candidate cards for each selector (in order, each node once) with everything the
+# parser needs: rendered text, class, tag and raw image URL candidates (same sources
+# as node_image_urls), plus their HTML for nodes matching the arguments[1] selector
+# (the real listing cards only, not the broad fallback wrappers). The result is
+# returned as one JSON string, cheaper to ship than a WebDriver-serialized object tree
+CARDS_JS = """
+function imageUrls(e) {
+    var urls = [];
+    e.querySelectorAll('img').forEach(function (img) {
+        ['src', 'data-src', 'data-lazy', 'data-original'].forEach(function (a) {
+            urls.push(a === 'src' ? img.src : img.getAttribute(a));
+        });
+        var srcset = img.getAttribute('srcset') || img.getAttribute('data-srcset');
+        if (srcset) srcset.split(',').forEach(function (p) { urls.push(p.trim().split(' ')[0]); });
+    });
+    e.querySelectorAll('a[href]').forEach(function (a) {
+        if (/\\.(jpe?g|png|webp)$/i.test(a.href)) urls.push(a.href);
+    });
+    e.querySelectorAll('*[style*="background"]').forEach(function (el) {
+        var re = /url\\((["']?)([^)"']+)/gi, style = el.getAttribute('style') || '', m;
+        while ((m = re.exec(style))) urls.push(m[2]);
+    });
+    return urls;
+}
+var out = [], seen = new Set(), htmlSel = arguments[1];
+arguments[0].forEach(function (sel) {
+    document.querySelectorAll(sel).forEach(function (e) {
+        if (seen.has(e)) return;
+        seen.add(e);
+        out.push({
+            text: e.innerText,
+            cls: e.getAttribute('class') || '',
+            tag: e.tagName.toLowerCase(),
+            imgs: imageUrls(e),
+            html: htmlSel && e.matches(htmlSel) ? e.outerHTML : null
+        });
+    });
+});
+return JSON.stringify(out);
+"""
+
+# Field extractors, compiled once instead of per property
+_URL_RE = re.compile(r'https://urbania\.pe/[^\s]+')
+_PRICE_RE = re.compile(r'S/\s*([0-9,]+)')
+_AREA_RE = re.compile(r'(\d+)\s*m[²2]')
+_BED_RE = re.compile(r'(\d+)\s*(?:dormitorio|habitacion|dorm)')
+_BATH_RE = re.compile(r'(\d+)\s*baño')
+_PHONE_RE = re.compile(r'(\+51\s*[0-9\s\-]{8,})')
+# Words that mark a text as a property listing (see looks_like_property)
+_PROP_WORDS_RE = re.compile(r'alquiler|departamento|casa|m²|m2|dormitorio|baño')
+
+# Lima districts recognised in the listing text; one whole-word alternation
+# so e.g. "surco" does not match inside another word
+DISTRICTS = (
+    'miraflores', 'san isidro', 'barranco', 'surco', 'la molina',
+    'san borja', 'magdalena', 'pueblo libre', 'jesús maría',
+    'lince', 'la victoria', 'chorrillos', 'san miguel'
+)
+_DISTRICT_RE = re.compile(r'\b(' + '|'.join(re.escape(d) for d in DISTRICTS) + r')\b')
+_DISTRICT_TITLES = {d: d.title() for d in DISTRICTS}
+_WS_RE = re.compile(r'\s+')
+_IMAGE_ATTRS = ('src', 'data-src', 'data-lazy', 'data-original')
+_IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp')
+# Responses worth retrying when downloading an image
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Bodies announced below this size are placeholders / tracking pixels, not photos
+_MIN_IMAGE_BYTES = 1024
+# Downloaded images are written through a 1 MiB buffer (16 streamed 64 KiB chunks per write syscall)
+_IMAGE_WRITE_BUFFER = 1 << 20
+_BG_URL_RE = re.compile(r'url\((\"|\')?(?P<u>[^)\"\']+)', re.IGNORECASE)
+
+# Keywords behind each boolean feature (and the property type)
+FEATURE_KEYWORDS = {
+    'house': ('casa',),
+    'apartment': ('departamento',),
+    'has_parking': ('estacionamiento', 'cochera', 'garage'),
+    'has_pool': ('piscina',),
+    'has_garden': ('jardín', 'jardin', 'área verde'),
+    'has_balcony': ('balcón', 'terraza'),
+    'has_elevator': ('ascensor',),
+    'has_security': ('seguridad', 'vigilancia'),
+    'has_gym': ('gimnasio',),
+    'is_furnished': ('amoblado',),
+    'allows_pets': ('mascota',),
+    'is_new': ('nuevo', 'estreno'),
+    'has_terrace': ('terraza',),
+    'has_laundry': ('lavandería',),
+    'has_air_conditioning': ('aire acondicionado', 'climatizado'),
+}
+BOOLEAN_FEATURES = tuple(f for f in FEATURE_KEYWORDS if f not in ('house', 'apartment'))
+_BOOLEAN_FEATURE_SET = frozenset(BOOLEAN_FEATURES)
+
+# One alternation over every keyword finds them all in a single scan;
+# each keyword maps back to the feature(s) it implies
+_KEYWORD_FLAGS: Dict[str, set] = {}
+for _flag, _words in FEATURE_KEYWORDS.items():
+    for _word in _words:
+        _KEYWORD_FLAGS.setdefault(_word, set()).add(_flag)
+_KEYWORD_RE = re.compile('|'.join(re.escape(w) for w in sorted(_KEYWORD_FLAGS, key=len, reverse=True)))
+
+
+def keyword_flags(text_lower: str) -> set:
+    """Features whose keywords appear in the (lowercased) text."""
+    flags = set()
+    for kw in set(_KEYWORD_RE.findall(text_lower)):
+        flags |= _KEYWORD_FLAGS[kw]
+    return flags
+
+
+# CSV columns: every key create_property_data fills, in that order
+RESULT_FIELDS = (
+    'index', 'scraped_at', 'element_class', 'element_tag', 'full_text', 'property_type',
+    'title', 'url', 'has_url', 'price_raw', 'price_numeric', 'has_price', 'currency',
+    'location', 'has_location', 'area_raw', 'area_numeric', 'bedrooms', 'bathrooms',
+    'has_parking', 'parking_count', 'has_pool', 'has_garden', 'has_balcony', 'has_elevator',
+    'has_security', 'has_gym', 'is_furnished', 'allows_pets', 'is_new', 'has_terrace',
+    'has_laundry', 'has_air_conditioning', 'phone', 'image_urls', 'image_count',
+    'price_per_sqm', 'data_completeness', 'feature_count', 'page', 'site_page', 'global_index',
+)
+_RESULT_ROW = operator.itemgetter(*RESULT_FIELDS)
+
+
+# data-qa hooks of the structured parts of a posting card
+CARD_FIELD_SELECTORS = {
+    'price': '[data-qa="POSTING_CARD_PRICE"]',
+    'features': '[data-qa="POSTING_CARD_FEATURES"]',
+    'location': '[data-qa="POSTING_CARD_LOCATION"]',
+}
+
+
+def card_fields(tree) -> Dict[str, str]:
+    """Text of the structured card parts (plus the posting URL) from a selectolax tree/node."""
+    fields = {}
+    for name, selector in CARD_FIELD_SELECTORS.items():
+        node = tree.css_first(selector)
+        if node is not None:
+            fields[name] = node.text(separator=' ', strip=True)
+    node = tree.css_first('[data-to-posting]')
+    if node is not None:
+        href = node.attributes.get('data-to-posting') or ''
+        if href.startswith('/'):
+            fields['url'] = f"https://urbania.pe{href}"
+    return fields
+
+
+def _loads(text: str) -> Any:
+    """Parse JSON text (orjson when installed)."""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _dumps_record(record: Dict[str, Any]) -> bytes:
+    """Serialize one property as UTF-8 JSON (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(record, ensure_ascii=False).encode('utf-8')
+
+
+def _csv_row(record: Dict[str, Any]) -> tuple:
+    """Values of one property in RESULT_FIELDS order (blank for missing keys)."""
+    try:
+        return _RESULT_ROW(record)
+    except KeyError:
+        return tuple(record.get(f, '') for f in RESULT_FIELDS)
+
+
+def _declared_too_small(headers) -> bool:
+    """True when Content-Length announces a body too small to be a listing photo."""
+    length = headers.get('Content-Length')
+    return length is not None and length.isdigit() and int(length) < _MIN_IMAGE_BYTES
+
+
+@lru_cache(maxsize=8192)
+def _safe_filename_from_url(url: str) -> str:
+    """File name of an image URL (cached: the same photos recur across pages and runs)."""
+    try:
+        path = urlparse(url).path
+        name = os.path.basename(path) or "image"
+        return unquote(name.split('?')[0])
+    except Exception:
+        return "image"
+
+
+def _clean_image_urls(candidates) -> List[str]:
+    """Normalize raw image URL candidates: strip, make protocol-relative URLs https, dedupe in order."""
+    urls: List[str] = []
+    seen = set()
+    for url in candidates:
+        if not url:
+            continue
+        u = url.strip()
+        if not u:
+            continue
+        # Normalize protocol-relative URLs
+        if u.startswith('//'):
+            u = 'https:' + u
+        if u not in seen:
+            seen.add(u)
+            urls.append(u)
+    return urls
+
+
+def node_image_urls(node) -> List[str]:
+    """Image URLs of a selectolax card node: <img> src/data-src/srcset, anchors to images
+    and CSS background images (the same sources CARDS_JS reads in the browser)."""
+    candidates: List[Optional[str]] = []
+    for img in node.css('img'):
+        for attr in _IMAGE_ATTRS:
+            candidates.append(img.attributes.get(attr))
+        # srcset may contain multiple URLs
+        srcset = img.attributes.get('srcset') or img.attributes.get('data-srcset')
+        if srcset:
+            for part in srcset.split(','):
+                candidates.append(part.strip().split(' ')[0])
+    # Anchors linking directly to images
+    for a in node.css('a[href]'):
+        href = a.attributes.get('href')
+        if href and href.lower().endswith(_IMAGE_EXTS):
+            candidates.append(href)
+    # Background images in style attributes
+    for el in node.css('*[style*="background"]'):
+        for m in _BG_URL_RE.finditer(el.attributes.get('style') or ''):
+            candidates.append(m.group('u'))
+    return _clean_image_urls(candidates)
+
+
+def _search(regex, part: Optional[str], text: str):
+    """Search a structured card part first and the full text only if that fails."""
+    if part:
+        match = regex.search(part)
+        if match:
+            return match
+    return regex.search(text)
+
 
 class MinimalUrbaniaScraper:
     """
@@ -56,15 +342,42 @@ class MinimalUrbaniaScraper:
         self.properties = []
         self.current_site_page = 1
         self.global_index_counter = 0
+        # number of browsers scraping page shards in parallel
+        self.workers = 1
+        # threads parsing cards while the browser loads the next page
+        self.parse_workers = min(4, os.cpu_count() or 1)
+        # block images/fonts/trackers in the browser
+        self.block_assets = True
+        # cookies persisted between runs to skip the Cloudflare challenge
+        self.cookies_path = ".uc_cookies.json"
+        self._cookies_restored = False
+        self._cookies_saved = False
+        # cookies handed over by the bootstrap browser (shard workers); used instead of the file
+        self.shared_cookies = None
+        # fetch pages after the first one over HTTP (needs selectolax)
+        self.use_http = True
         # image downloading options
         self.download_images = False
         self.images_dir = "images"
+        # parallel image downloads sharing one keep-alive session
+        self.image_workers = 16
+        self._image_session = None
+        # image folders already created this run
+        self._dirs_created: set[str] = set()
         # GCS options
         self.gcs_bucket_name = None
         self.gcs_prefix = "raw_data"
         self.gcp_keyfile = None
         self._gcs_client = None
         self._gcs_bucket = None
+        # streaming result uploads (opened on the first written page)
+        self._csv_stream = None
+        self._csv_writer = None
+        self._json_stream = None
+        self._json_count = 0
+        # uploads run here so they overlap with scraping (created by setup_gcs)
+        self._upload_pool = None
+        self._upload_futures = []
 
     def setup_gcs(self) -> bool:
         """Initialize GCS client and bucket if configured."""
@@ -82,6 +395,7 @@ class MinimalUrbaniaScraper:
             self._gcs_bucket = self._gcs_client.bucket(self.gcs_bucket_name)
             # Lazy existence check
             _ = self._gcs_bucket.exists()
+            self._upload_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gcs-upload")
             logger.info(f"☁️ GCS configured for bucket: gs://{self.gcs_bucket_name}/{self.gcs_prefix}")
             return True
         except Exception as e:
@@ -105,6 +419,20 @@ class MinimalUrbaniaScraper:
             logger.warning(f"⚠️ GCS upload failed for {local_path}: {e}")
             return False
 
+    def submit_upload(self, fn, *args):
+        """Run an upload on the GCS pool (inline when there is none)."""
+        if self._upload_pool is None:
+            fn(*args)
+            return
+        self._upload_futures.append(self._upload_pool.submit(fn, *args))
+
+    def wait_for_uploads(self):
+        """Block until every submitted upload has finished."""
+        futures = self._upload_futures[:]
+        del self._upload_futures[:len(futures)]
+        if futures:
+            wait(futures)
+
     def setup_minimal_driver(self) -> bool:
         """Setup Chrome driver with absolute minimal options"""
         try:
@@ -114,11 +442,18 @@ class MinimalUrbaniaScraper:
             options = uc.ChromeOptions()
             options.add_argument("--no-sandbox")
             options.add_argument("--disable-dev-shm-usage")
+            if self.block_assets and not self.download_images:
+                options.add_argument("--blink-settings=imagesEnabled=false")
+                # Profile-level setting too, so images stay off in every tab/frame
+                options.add_experimental_option('prefs', {
+                    'profile.managed_default_content_settings.images': 2,
+                })
             
             # Create driver with minimal configuration
             self.driver = uc.Chrome(options=options)
             self.driver.maximize_window()
-            time.sleep(3)
+            if self.block_assets:
+                self.block_unused_requests()
             
             logger.info("✅ Minimal driver setup completed")
             return True
@@ -127,39 +462,108 @@ class MinimalUrbaniaScraper:
             logger.error(f"❌ Failed to setup driver: {e}")
             return False
 
-    def wait_for_cloudflare(self, timeout: int = 120) -> bool:
+    def block_unused_requests(self):
+        """Block images, fonts, media and trackers via CDP; the scraper only reads text.
+        Images are kept when they are going to be downloaded."""
+        patterns = list(BLOCKED_URL_PATTERNS)
+        if not self.download_images:
+            patterns += BLOCKED_IMAGE_PATTERNS
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            logger.info(f"🚫 Blocking {len(patterns)} non-essential URL patterns")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not block URLs via CDP: {e}")
+
+    def save_cookies(self):
+        """Persist the browser cookies (incl. cf_clearance) for the next run."""
+        if not self.cookies_path or self._cookies_saved:
+            return
+        try:
+            tmp_path = f"{self.cookies_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.driver.get_cookies(), f)
+            os.replace(tmp_path, self.cookies_path)
+            self._cookies_saved = True
+            logger.info(f"🍪 Cookies saved to {self.cookies_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save cookies: {e}")
+
+    def restore_cookies(self) -> bool:
+        """Load cookies saved by a previous run (or shared by the bootstrap browser)
+        into the browser (once per driver)."""
+        if self._cookies_restored:
+            return False
+        if self.shared_cookies is not None:
+            cookies = self.shared_cookies
+        elif self.cookies_path and os.path.exists(self.cookies_path):
+            try:
+                with open(self.cookies_path, 'r', encoding='utf-8') as f:
+                    cookies = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read saved cookies: {e}")
+                return False
+        else:
+            return False
+        self._cookies_restored = True
+        now = time.time()
+        added = 0
+        for c in cookies:
+            if c.get('expiry') and c['expiry'] < now:
+                continue
+            try:
+                self.driver.add_cookie(c)
+                added += 1
+            except Exception:
+                continue
+        if added:
+            logger.info(f"🍪 Restored {added} saved cookies")
+        return added > 0
+
+    def page_url(self, page_num: int) -> str:
+        """URL of a given results page"""
+        return self.base_url if page_num <= 1 else f"{self.base_url}?page={page_num}"
+
+    def wait_for_cloudflare(self, timeout: int = 120, url: str | None = None) -> bool:
         """Simple Cloudflare wait with patience"""
         try:
             logger.info("🛡️ Navigating to Urbania and waiting for Cloudflare...")
             
-            self.driver.get(self.base_url)
-            time.sleep(10)  # Initial wait
-            
-            start_time = time.time()
-            while time.time() - start_time < timeout:
+            self.driver.get(url or self.base_url)
+
+            # Reuse the clearance cookies of an earlier run; if still valid the cards show up at once
+            if self.restore_cookies():
+                self.driver.get(url or self.base_url)
                 try:
-                    page_source = self.driver.page_source.lower()
-                    
-                    # Check if we have property content
-                    if ('departamento' in page_source and 
-                        'alquiler' in page_source and 
-                        len(page_source) > 50000):
-                        logger.info("✅ Page loaded successfully!")
-                        return True
-                    
-                    # Check for Cloudflare
-                    if 'cloudflare' in page_source or 'just a moment' in page_source:
-                        elapsed = int(time.time() - start_time)
-                        if elapsed % 20 == 0:  # Log every 20 seconds
-                            logger.info(f"⏳ Waiting for Cloudflare... ({elapsed}s/{timeout}s)")
-                    
-                    time.sleep(5)
-                    
-                except Exception as e:
-                    logger.warning(f"⚠️ Error checking page: {e}")
-                    time.sleep(5)
-            
-            logger.error(f"❌ Timeout after {timeout} seconds")
+                    WebDriverWait(self.driver, 5, poll_frequency=0.5).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR))
+                    )
+                    logger.info("✅ Page loaded with saved cookies!")
+                    self.save_cookies()
+                    return True
+                except TimeoutException:
+                    logger.info("ℹ️ Saved cookies did not skip Cloudflare; waiting for the challenge.")
+
+            # Wait for the first property card instead of polling page_source
+            try:
+                WebDriverWait(self.driver, timeout, poll_frequency=1.0).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR))
+                )
+                logger.info("✅ Page loaded successfully!")
+                self.save_cookies()
+                return True
+            except TimeoutException:
+                pass
+
+            # Fallback: a boolean DOM/title probe tells Cloudflare apart from a layout change
+            try:
+                on_challenge = bool(self.driver.execute_script(CHALLENGE_JS))
+            except Exception:
+                on_challenge = False
+            if on_challenge:
+                logger.error(f"❌ Still on Cloudflare challenge after {timeout} seconds")
+            else:
+                logger.error(f"❌ Timeout after {timeout} seconds (no property cards found)")
             return False
             
         except Exception as e:
@@ -170,128 +574,228 @@ class MinimalUrbaniaScraper:
         """Simple property extraction"""
         try:
             logger.info("🔍 Starting simple property extraction...")
-            
-            # Scroll page to load content
-            logger.info("📜 Scrolling to load content...")
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
-            
-            # Upload page source to GCS (cloud-only)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            return self.parse_cards(self.collect_cards())
+        except Exception as e:
+            logger.error(f"❌ Error in extraction: {e}")
+            return []
+
+    def collect_cards(self) -> List[Dict[str, Any]]:
+        """Pull the property cards of the current page out of the browser.
+        This is the only step that talks to Selenium; parsing happens in parse_cards."""
+        # Scroll page to load content
+        logger.info("📜 Scrolling to load content...")
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        self._wait_cards_settled()
+        self.driver.execute_script("window.scrollTo(0, 0);")
+        
+        # Page source dump is debug-only (URBANIA_DEBUG_HTML=1); uploaded off-thread
+        if os.environ.get('URBANIA_DEBUG_HTML'):
             if self._gcs_bucket:
-                try:
-                    key = f"{self.gcs_prefix.rstrip('/')}/minimal_page_source_{timestamp}.html"
-                    blob = self._gcs_bucket.blob(key)
-                    blob.upload_from_string(self.driver.page_source, content_type="text/html")
-                    logger.info(f"☁️ Page source uploaded: gs://{self.gcs_bucket_name}/{key}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Failed to upload page source to GCS: {e}")
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                key = f"{self.gcs_prefix.rstrip('/')}/minimal_page_source_{timestamp}.html"
+                self.submit_upload(self._upload_page_source, key, self.driver.page_source)
             else:
                 logger.info("ℹ️ GCS not configured; skipping page source upload.")
-            
-            # Try multiple selectors to find property elements
-            selectors = [
-                'div[class*="postingsList-module__card-container"]',
-                'div[class*="card-container"]',
-                'div[class*="posting-card"]',
-                'div[class*="property"]',
-                'div[class*="listing"]',
-                'article'
-            ]
-            
-            all_elements = []
-            for selector in selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        all_elements.extend(elements)
-                        logger.info(f"📊 Found {len(elements)} elements with: {selector}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Error with selector {selector}: {e}")
-            
-            if not all_elements:
-                logger.error("❌ No property elements found")
-                return []
-            
-            logger.info(f"📊 Total elements found: {len(all_elements)}")
-            
-            # Process elements
-            properties = []
-            processed_texts = set()
-            
-            for i, element in enumerate(all_elements):
-                try:
-                    text = element.text.strip()
-                    
-                    # Skip if empty or duplicate
-                    if not text or len(text) < 50 or text in processed_texts:
-                        continue
-                    
-                    # Check if looks like property
-                    if self.looks_like_property(text):
-                        property_data = self.create_property_data(element, text, i + 1)
-                        if property_data:
-                            properties.append(property_data)
-                            processed_texts.add(text)
-                            
-                            if len(properties) % 5 == 0:
-                                logger.info(f"📈 Extracted {len(properties)} properties so far...")
+        
+        # Try multiple selectors to find property elements.
+        # One script call returns every candidate card with its text,
+        # instead of a find_elements + element.text round-trip per card
+        try:
+            payload = self.driver.execute_script(
+                CARDS_JS, CARD_SELECTORS, CARD_SELECTOR if HTMLParser is not None else None)
+            candidates = _loads(payload) if payload else []
+        except Exception as e:
+            logger.warning(f"⚠️ Error collecting property elements: {e}")
+            candidates = []
+        
+        if not candidates:
+            logger.error("❌ No property elements found")
+            return []
+        
+        logger.info(f"📊 Total elements found: {len(candidates)}")
+
+        def _resolve(card: Dict[str, Any]):
+            card['image_urls'] = _clean_image_urls(card.pop('imgs', None) or [])
+
+        return self._filter_cards(candidates, _resolve)
+
+    def _filter_cards(self, candidates: List[Dict[str, Any]], resolve=None) -> List[Dict[str, Any]]:
+        """Keep the candidates that look like properties, once per (whitespace-insensitive) text.
+        `resolve` fills in the element-bound data of the cards that are kept."""
+        cards = []
+        processed_hashes: set[int] = set()
+        for i, card in enumerate(candidates):
+            try:
+                text = (card.get('text') or '').strip()
                 
-                except Exception as e:
-                    logger.warning(f"⚠️ Error processing element {i}: {e}")
+                # Skip if empty or duplicate
+                if not text or len(text) < 50:
                     continue
-            
-            logger.info(f"✅ Extraction complete: {len(properties)} properties")
-            return properties
-            
+                text_hash = hash(_WS_RE.sub(' ', text))
+                if text_hash in processed_hashes:
+                    continue
+                
+                # Check if looks like property
+                text_lower = text.lower()
+                if not self.looks_like_property(text_lower):
+                    continue
+                processed_hashes.add(text_hash)
+                card.update(text=text, text_lower=text_lower, index=i + 1)
+                if resolve:
+                    resolve(card)
+                cards.append(card)
+            except Exception as e:
+                logger.warning(f"⚠️ Error processing element {i}: {e}")
+                continue
+        return cards
+
+    def parse_cards(self, cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn collected cards into property records (pure CPU, no browser access)."""
+        properties = []
+        # One timestamp per page batch instead of a datetime call per card
+        scraped_at = datetime.now().isoformat()
+        for card in cards:
+            property_data = self.create_property_data(card, card['index'], scraped_at)
+            if property_data:
+                properties.append(property_data)
+        logger.info(f"✅ Extraction complete: {len(properties)} properties")
+        return properties
+
+    def _wait_cards_settled(self, timeout: float = 3.0):
+        """After a scroll, wait until the document is complete and the card count
+        stops changing between two polls (lazy-loaded cards), at most `timeout` s."""
+        last = [None]
+
+        def _settled(driver) -> bool:
+            state = driver.execute_script(
+                "return document.readyState + ':' + document.querySelectorAll(arguments[0]).length;",
+                CARD_SELECTOR)
+            done = state == last[0] and state.startswith('complete')
+            last[0] = state
+            return done
+
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.5).until(_settled)
+        except TimeoutException:
+            pass
+
+    def _upload_page_source(self, key: str, html: str):
+        """Upload a page source dump to GCS (runs in a background thread)."""
+        try:
+            # HTML compresses ~5-8x; GCS serves it back decompressed (transcoding)
+            blob = self._gcs_bucket.blob(key)
+            blob.content_encoding = "gzip"
+            data = gzip.compress(html.encode('utf-8'), compresslevel=6)
+            # if_generation_match=0: the key is new, so skip the overwrite preflight
+            blob.upload_from_string(data, content_type="text/html; charset=utf-8", if_generation_match=0)
+            logger.info(f"☁️ Page source uploaded: gs://{self.gcs_bucket_name}/{key}")
         except Exception as e:
-            logger.error(f"❌ Error in extraction: {e}")
-            return []
+            logger.warning(f"⚠️ Failed to upload page source to GCS: {e}")
 
-    def looks_like_property(self, text: str) -> bool:
-        """Check if text looks like a property listing"""
-        text_lower = text.lower()
-        
-        # Must have property keywords
-        property_words = ['alquiler', 'departamento', 'casa', 'm²', 'm2', 'dormitorio', 'baño']
-        word_count = sum(1 for word in property_words if word in text_lower)
-        
-        return word_count >= 2 and len(text) > 100
+    def build_http_session(self) -> Optional[requests.Session]:
+        """Pooled requests session carrying the browser's Cloudflare cookies and UA."""
+        if HTMLParser is None:
+            logger.info("ℹ️ selectolax not installed; pages will be loaded in the browser.")
+            return None
+        try:
+            ua = self.driver.execute_script("return navigator.userAgent") or "Mozilla/5.0"
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+            session.headers.update({
+                "User-Agent": ua,
+                "Referer": self.base_url,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "es-PE,es;q=0.9,en;q=0.8"
+            })
+            for c in self.driver.get_cookies():
+                session.cookies.set(c.get('name'), c.get('value'), domain=c.get('domain'))
+            return session
+        except Exception as e:
+            logger.warning(f"⚠️ Could not build HTTP session: {e}")
+            return None
 
-    def create_property_data(self, element, text: str, index: int) -> Dict[str, Any]:
-        """Create property data from element and text"""
+    def extract_properties_http(self, session: requests.Session, page_num: int) -> Optional[List[Dict[str, Any]]]:
+        """Fetch a results page over HTTP and parse its cards without the browser.
+        Returns None when the page could not be fetched (e.g. Cloudflare challenge)."""
+        cards = self.fetch_cards_http(session, page_num)
+        return None if cards is None else self.parse_cards(cards)
+
+    def fetch_cards_http(self, session: requests.Session, page_num: int) -> Optional[List[Dict[str, Any]]]:
+        """Fetch a results page over HTTP and collect its property cards.
+        Returns None when the page could not be fetched (e.g. Cloudflare challenge)."""
         try:
+            resp = session.get(self.page_url(page_num), timeout=30)
+            if resp.status_code != 200:
+                logger.warning(f"⚠️ HTTP {resp.status_code} for page {page_num}")
+                return None
+            tree = HTMLParser(resp.text)
+            # One combined selector: every node comes back once, in document order
+            nodes = tree.css(', '.join(CARD_SELECTORS))
+            if not nodes:
+                logger.warning(f"⚠️ No property cards in HTTP response for page {page_num}")
+                return None
+
+            def _resolve(card: Dict[str, Any]):
+                node = card.pop('node')
+                card['cls'] = node.attributes.get('class') or ""
+                card['tag'] = node.tag
+                card['image_urls'] = node_image_urls(node)
+                card['fields'] = card_fields(node)
+
+            candidates = [{'node': node, 'text': node.text(separator='\n', strip=True)} for node in nodes]
+            cards = self._filter_cards(candidates, _resolve)
+            logger.info(f"🌐 Page {page_num} fetched over HTTP: {len(cards)} cards")
+            return cards
+        except Exception as e:
+            logger.warning(f"⚠️ HTTP extraction failed for page {page_num}: {e}")
+            return None
+
+    def looks_like_property(self, text_lower: str) -> bool:
+        """Check if (already lowercased) text looks like a property listing"""
+        # Must have at least two different property keywords (one regex scan)
+        return len(text_lower) > 100 and len(set(_PROP_WORDS_RE.findall(text_lower))) >= 2
+
+    def create_property_data(self, card: Dict[str, Any], index: int, scraped_at: str | None = None) -> Dict[str, Any]:
+        """Create property data from a collected card (see collect_cards / fetch_cards_http).
+        The card's structured parts (`fields`, or its `html`; see card_fields) are searched
+        first and the full text only when a part is missing."""
+        try:
+            text = card['text']
             property_data = {
                 'index': index,
-                'scraped_at': datetime.now().isoformat(),
-                'element_class': element.get_attribute('class') or "",
-                'element_tag': element.tag_name,
+                'scraped_at': scraped_at or datetime.now().isoformat(),
+                'element_class': card.get('cls') or "",
+                'element_tag': card.get('tag') or "",
                 'full_text': text,
                 'property_type': 'property'
             }
             
-            # Basic parsing
-            text_lower = text.lower()
+            # Basic parsing (the lowercased text is computed once while filtering)
+            text_lower = card.get('text_lower') or text.lower()
+            fields = card.get('fields')
+            if fields is None:
+                fields = card_fields(HTMLParser(card['html'])) if card.get('html') else {}
+            features_lower = fields['features'].lower() if fields.get('features') else None
             
+            flags = keyword_flags(text_lower)
+
             # Property type
-            if 'casa' in text_lower:
+            if 'house' in flags:
                 property_data['property_type'] = 'house'
-            elif 'departamento' in text_lower:
+            elif 'apartment' in flags:
                 property_data['property_type'] = 'apartment'
             
             # Title (first line with good content)
-            lines = [line.strip() for line in text.split('\n') if len(line.strip()) > 10]
-            property_data['title'] = lines[0] if lines else "N/A"
+            property_data['title'] = next(
+                (line for line in map(str.strip, text.split('\n')) if len(line) > 10), "N/A")
             
             # URL
-            url_match = re.search(r'https://urbania\.pe/[^\s]+', text)
-            property_data['url'] = url_match.group(0) if url_match else "N/A"
+            url_match = None if fields.get('url') else _URL_RE.search(text)
+            property_data['url'] = fields.get('url') or (url_match.group(0) if url_match else "N/A")
             property_data['has_url'] = property_data['url'] != "N/A"
             
             # Price
-            price_match = re.search(r'S/\s*([0-9,]+)', text)
+            price_match = _search(_PRICE_RE, fields.get('price'), text)
             if price_match:
                 property_data['price_raw'] = price_match.group(0)
                 try:
@@ -308,22 +812,19 @@ class MinimalUrbaniaScraper:
             property_data['currency'] = "PEN"
             
             # Location - check for Lima districts
-            districts = [
-                'miraflores', 'san isidro', 'barranco', 'surco', 'la molina',
-                'san borja', 'magdalena', 'pueblo libre', 'jesús maría',
-                'lince', 'la victoria', 'chorrillos', 'san miguel'
-            ]
-            
             property_data['location'] = "Lima"
             property_data['has_location'] = True
             
-            for district in districts:
-                if district in text_lower:
-                    property_data['location'] = district.title()
+            # The card's location line is checked before the full text
+            location_lower = fields['location'].lower() if fields.get('location') else ''
+            for source in (location_lower, text_lower):
+                district_match = _DISTRICT_RE.search(source)
+                if district_match:
+                    property_data['location'] = _DISTRICT_TITLES[district_match.group(1)]
                     break
             
             # Area
-            area_match = re.search(r'(\d+)\s*m[²2]', text_lower)
+            area_match = _search(_AREA_RE, features_lower, text_lower)
             if area_match:
                 property_data['area_raw'] = area_match.group(0)
                 property_data['area_numeric'] = int(area_match.group(1))
@@ -332,35 +833,25 @@ class MinimalUrbaniaScraper:
                 property_data['area_numeric'] = None
             
             # Bedrooms
-            bedroom_match = re.search(r'(\d+)\s*(?:dormitorio|habitacion|dorm)', text_lower)
+            bedroom_match = _search(_BED_RE, features_lower, text_lower)
             property_data['bedrooms'] = int(bedroom_match.group(1)) if bedroom_match else None
             
             # Bathrooms
-            bathroom_match = re.search(r'(\d+)\s*baño', text_lower)
+            bathroom_match = _search(_BATH_RE, features_lower, text_lower)
             property_data['bathrooms'] = int(bathroom_match.group(1)) if bathroom_match else None
             
             # Simple features
-            property_data['has_parking'] = any(word in text_lower for word in ['estacionamiento', 'cochera', 'garage'])
-            property_data['parking_count'] = 1 if property_data['has_parking'] else 0
-            property_data['has_pool'] = 'piscina' in text_lower
-            property_data['has_garden'] = any(word in text_lower for word in ['jardín', 'jardin', 'área verde'])
-            property_data['has_balcony'] = any(word in text_lower for word in ['balcón', 'terraza'])
-            property_data['has_elevator'] = 'ascensor' in text_lower
-            property_data['has_security'] = any(word in text_lower for word in ['seguridad', 'vigilancia'])
-            property_data['has_gym'] = 'gimnasio' in text_lower
-            property_data['is_furnished'] = 'amoblado' in text_lower
-            property_data['allows_pets'] = 'mascota' in text_lower
-            property_data['is_new'] = any(word in text_lower for word in ['nuevo', 'estreno'])
-            property_data['has_terrace'] = 'terraza' in text_lower
-            property_data['has_laundry'] = 'lavandería' in text_lower
-            property_data['has_air_conditioning'] = any(word in text_lower for word in ['aire acondicionado', 'climatizado'])
+            for feature in BOOLEAN_FEATURES:
+                property_data[feature] = feature in flags
+                if feature == 'has_parking':
+                    property_data['parking_count'] = 1 if property_data['has_parking'] else 0
             
             # Phone
-            phone_match = re.search(r'(\+51\s*[0-9\s\-]{8,})', text)
+            phone_match = _PHONE_RE.search(text)
             property_data['phone'] = phone_match.group(1) if phone_match else "N/A"
             
             # Additional fields - image URLs
-            image_urls = self.extract_image_urls_from_element(element)
+            image_urls = card.get('image_urls') or []
             property_data['image_urls'] = image_urls
             property_data['image_count'] = len(image_urls)
             
@@ -381,14 +872,8 @@ class MinimalUrbaniaScraper:
             ]
             property_data['data_completeness'] = sum(key_fields) / len(key_fields) * 100
             
-            # Feature count
-            boolean_features = [
-                'has_parking', 'has_pool', 'has_garden', 'has_balcony',
-                'has_elevator', 'has_security', 'has_gym', 'is_furnished',
-                'allows_pets', 'is_new', 'has_terrace', 'has_laundry',
-                'has_air_conditioning'
-            ]
-            property_data['feature_count'] = sum(property_data.get(f, False) for f in boolean_features)
+            # Feature count (straight from the keyword scan, no per-feature lookups)
+            property_data['feature_count'] = len(flags & _BOOLEAN_FEATURE_SET)
             
             # Page info
             property_data['page'] = 1
@@ -401,44 +886,65 @@ class MinimalUrbaniaScraper:
             logger.warning(f"⚠️ Error creating property data: {e}")
             return None
 
+    def write_page_results(self, properties: List[Dict[str, Any]]):
+        """Append properties to the run's CSV and JSON uploads, opening the GCS streams on first use."""
+        if not properties or not self._gcs_bucket:
+            return
+        try:
+            if self._json_stream is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                base = f"{self.gcs_prefix.rstrip('/')}/urbania_minimal_results_{timestamp}"
+                self._csv_key, self._json_key = f"{base}.csv", f"{base}.json"
+                self._csv_stream = self._gcs_bucket.blob(self._csv_key).open('w', content_type="text/csv")
+                self._csv_writer = csv.writer(self._csv_stream)
+                self._csv_writer.writerow(RESULT_FIELDS)
+                self._json_stream = self._gcs_bucket.blob(self._json_key).open(
+                    'wb', content_type="application/json; charset=utf-8")
+                self._json_stream.write(b'[')
+                self._json_count = 0
+
+            self._csv_writer.writerows(map(_csv_row, properties))
+            for prop in properties:
+                self._json_stream.write((b'\n' if self._json_count == 0 else b',\n') + _dumps_record(prop))
+                self._json_count += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to stream results to GCS: {e}")
+
+    def close_result_streams(self, warn: bool = True):
+        """Finish the CSV and JSON uploads started by write_page_results."""
+        if self._json_stream is None:
+            if warn and not self._gcs_bucket:
+                logger.warning("⚠️ GCS not configured; cannot upload results.")
+            return
+        # Each close flushes the last chunk and finalizes its upload; both go out at once
+        self.submit_upload(self._close_csv_stream, self._csv_stream, self._csv_key)
+        self.submit_upload(self._close_json_stream, self._json_stream, self._json_key)
+        self._csv_stream = self._csv_writer = self._json_stream = None
+        self.wait_for_uploads()
+
+    def _close_csv_stream(self, stream, key: str):
+        try:
+            stream.close()
+            logger.info(f"☁️ CSV uploaded: gs://{self.gcs_bucket_name}/{key}")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to upload CSV to GCS: {e}")
+
+    def _close_json_stream(self, stream, key: str):
+        try:
+            stream.write(b'\n]\n')
+            stream.close()
+            logger.info(f"☁️ JSON uploaded: gs://{self.gcs_bucket_name}/{key}")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to upload JSON to GCS: {e}")
+
     def save_simple_results(self, properties: List[Dict[str, Any]]):
         """Upload results to GCS in CSV and JSON (no local files)."""
         try:
             if not properties:
                 logger.warning("⚠️ No properties to save")
                 return
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            if not self._gcs_bucket:
-                logger.warning("⚠️ GCS not configured; cannot upload results.")
-                return
-
-            # CSV (in-memory)
-            try:
-                if properties:
-                    fieldnames = list(properties[0].keys())
-                else:
-                    fieldnames = []
-                from io import StringIO
-                csv_buf = StringIO()
-                writer = csv.DictWriter(csv_buf, fieldnames=fieldnames)
-                writer.writeheader()
-                for prop in properties:
-                    writer.writerow(prop)
-                csv_key = f"{self.gcs_prefix.rstrip('/')}/urbania_minimal_results_{timestamp}.csv"
-                self._gcs_bucket.blob(csv_key).upload_from_string(csv_buf.getvalue(), content_type="text/csv")
-                logger.info(f"☁️ CSV uploaded: gs://{self.gcs_bucket_name}/{csv_key}")
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to upload CSV to GCS: {e}")
-
-            # JSON (in-memory)
-            try:
-                json_key = f"{self.gcs_prefix.rstrip('/')}/urbania_minimal_results_{timestamp}.json"
-                json_str = json.dumps(properties, ensure_ascii=False, indent=2)
-                self._gcs_bucket.blob(json_key).upload_from_string(json_str, content_type="application/json; charset=utf-8")
-                logger.info(f"☁️ JSON uploaded: gs://{self.gcs_bucket_name}/{json_key}")
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to upload JSON to GCS: {e}")
+            self.write_page_results(properties)
+            self.close_result_streams()
             
             # Print summary
             self.print_summary(properties)
@@ -488,31 +994,59 @@ class MinimalUrbaniaScraper:
             if getattr(self, '_override_max_pages', None):
                 max_pages = int(self._override_max_pages)
             all_properties: List[Dict[str, Any]] = []
-            for page_num in range(1, max_pages + 1):
-                logger.info(f"🧭 Extracting page {page_num}/{max_pages}")
-                self.current_site_page = page_num
-                page_properties = self.extract_properties_simple()
-
-                # Attach pagination metadata and global indices
-                for idx, prop in enumerate(page_properties, start=1):
-                    self.global_index_counter += 1
-                    prop['page'] = page_num
-                    prop['site_page'] = page_num
-                    prop['global_index'] = self.global_index_counter
-                
-                all_properties.extend(page_properties)
+            if self.workers > 1 and max_pages > 1:
+                all_properties = self.run_sharded(max_pages)
+                self.write_page_results(all_properties)
+            else:
+                # Once past Cloudflare, later pages are fetched over HTTP with the browser cookies
+                session = self.build_http_session() if self.use_http and max_pages > 1 else None
+                # Producer/consumer: this thread pulls cards (browser / HTTP I/O) while the
+                # parse pool turns the previous page's cards into properties
+                pending = []  # (page_num, future) in page order
+                with ThreadPoolExecutor(max_workers=self.parse_workers) as parse_pool:
+                    for page_num in range(1, max_pages + 1):
+                        logger.info(f"🧭 Extracting page {page_num}/{max_pages}")
+                        self.current_site_page = page_num
+                        cards = None
+                        if page_num > 1 and session is not None:
+                            cards = self.fetch_cards_http(session, page_num)
+                            if cards is None:
+                                # Fall back to the browser for the rest of the run
+                                logger.info("ℹ️ Falling back to browser pagination.")
+                                session = None
+                                if not self.wait_for_cloudflare(url=self.page_url(page_num)):
+                                    break
+                        if cards is None:
+                            try:
+                                cards = self.collect_cards()
+                            except Exception as e:
+                                logger.error(f"❌ Error in extraction: {e}")
+                                cards = []
 
-                # Try to go to next page unless last iteration
-                if page_num < max_pages:
-                    if not self.go_to_next_page():
-                        logger.info("ℹ️ No next page found. Stopping pagination.")
-                        break
+                        pending.append((page_num, parse_pool.submit(self.parse_cards, cards)))
+                        # Earlier pages are finished in order while this one parses
+                        while len(pending) > 1:
+                            all_properties.extend(self._finish_page(*pending.pop(0)))
+
+                        if session is not None and not cards:
+                            logger.info("ℹ️ Empty page. Stopping pagination.")
+                            break
+
+                        # Try to go to next page unless last iteration
+                        if page_num < max_pages and session is None:
+                            if not self.go_to_next_page():
+                                logger.info("ℹ️ No next page found. Stopping pagination.")
+                                break
+
+                    for item in pending:
+                        all_properties.extend(self._finish_page(*item))
                 
             if all_properties:
                 # Optionally download images
                 if self.download_images:
                     self.download_images_for_properties(all_properties)
-                self.save_simple_results(all_properties)
+                self.close_result_streams()
+                self.print_summary(all_properties)
                 logger.info(f"✅ Success! Extracted {len(all_properties)} properties from {self.current_site_page} page(s)")
             else:
                 logger.warning("⚠️ No properties extracted")
@@ -521,6 +1055,9 @@ class MinimalUrbaniaScraper:
             logger.error(f"❌ Scraper error: {e}")
         
         finally:
+            # Keep whatever was streamed if the run stopped early
+            self.close_result_streams(warn=False)
+            self.wait_for_uploads()
             if self.driver:
                 logger.info("🔒 Closing browser...")
                 try:
@@ -528,12 +1065,101 @@ class MinimalUrbaniaScraper:
                 except:
                     pass
 
+    def _finish_page(self, page_num: int, future) -> List[Dict[str, Any]]:
+        """Collect a parsed page: attach pagination metadata and global indices, stream it out."""
+        try:
+            page_properties = future.result()
+        except Exception as e:
+            logger.error(f"❌ Error parsing page {page_num}: {e}")
+            return []
+        for prop in page_properties:
+            self.global_index_counter += 1
+            prop['page'] = page_num
+            prop['site_page'] = page_num
+            prop['global_index'] = self.global_index_counter
+        # Results are streamed to GCS page by page
+        self.write_page_results(page_properties)
+        return page_properties
+
+    def scrape_shard(self, pages: List[int], cookies: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Scrape a range of pages with its own browser, loading each page by URL."""
+        worker = MinimalUrbaniaScraper()
+        worker.base_url = self.base_url
+        worker._gcs_bucket = self._gcs_bucket
+        worker._upload_pool = self._upload_pool
+        worker._upload_futures = self._upload_futures
+        worker.gcs_bucket_name = self.gcs_bucket_name
+        worker.gcs_prefix = self.gcs_prefix
+        worker.block_assets = self.block_assets
+        worker.cookies_path = self.cookies_path
+        worker.shared_cookies = cookies
+        worker.download_images = self.download_images
+        properties: List[Dict[str, Any]] = []
+        try:
+            if not worker.setup_minimal_driver():
+                return properties
+            for page_num in pages:
+                logger.info(f"🧭 [shard {pages[0]}-{pages[-1]}] Extracting page {page_num}")
+                if not worker.wait_for_cloudflare(url=worker.page_url(page_num)):
+                    logger.info(f"ℹ️ Page {page_num} did not load. Stopping shard.")
+                    break
+                worker.current_site_page = page_num
+                page_properties = worker.extract_properties_simple()
+                if not page_properties:
+                    break
+                for prop in page_properties:
+                    prop['page'] = page_num
+                    prop['site_page'] = page_num
+                properties.extend(page_properties)
+        except Exception as e:
+            logger.error(f"❌ Shard {pages[0]}-{pages[-1]} error: {e}")
+        finally:
+            if worker.driver:
+                try:
+                    worker.driver.quit()
+                except:
+                    pass
+        return properties
+
+    def run_sharded(self, max_pages: int) -> List[Dict[str, Any]]:
+        """Split pages 1..max_pages into contiguous shards and scrape them in parallel."""
+        workers = min(self.workers, max_pages)
+        size = -(-max_pages // workers)
+        shards = [list(range(start, min(start + size, max_pages + 1)))
+                  for start in range(1, max_pages + 1, size)]
+        logger.info(f"🧵 Scraping {max_pages} pages with {len(shards)} browsers")
+
+        # Every shard starts with the clearance the bootstrap browser already earned
+        try:
+            cookies = self.driver.get_cookies() if self.driver else None
+        except Exception:
+            cookies = None
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [pool.submit(self.scrape_shard, shard, cookies) for shard in shards]
+            wait(futures)
+
+        all_properties: List[Dict[str, Any]] = []
+        for future in futures:
+            all_properties.extend(future.result())
+
+        # Global indices are assigned after the merge so they stay monotonic
+        for prop in all_properties:
+            self.global_index_counter += 1
+            prop['global_index'] = self.global_index_counter
+        if all_properties:
+            self.current_site_page = max(p['page'] for p in all_properties)
+        return all_properties
+
     def go_to_next_page(self, timeout: int = 60) -> bool:
         """Click the next page control and wait for content to change.
         Returns True if navigation succeeds, False if no next page or timeout."""
         try:
             logger.info("➡️  Attempting to navigate to next page...")
             previous_signature = self._page_signature()
+            # The current first card goes stale as soon as the next page replaces it
+            old_cards = self.driver.find_elements(By.CSS_SELECTOR, 'div[class*="card-container"]')
+            old_card = old_cards[0] if old_cards else None
 
             # Common next-page selectors on Urbania
             next_selectors = [
@@ -563,9 +1189,7 @@ class MinimalUrbaniaScraper:
 
             # Scroll into view and click via JS to avoid intercept issues
             try:
-                self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", next_elem)
-                time.sleep(1)
-                self.driver.execute_script("arguments[0].click();", next_elem)
+                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();", next_elem)
             except Exception as e:
                 logger.warning(f"⚠️ Error clicking next: {e}")
                 try:
@@ -574,16 +1198,23 @@ class MinimalUrbaniaScraper:
                     logger.error(f"❌ Fallback click failed: {e2}")
                     return False
 
-            # Wait for page content to change
-            start = time.time()
-            while time.time() - start < timeout:
-                time.sleep(2)
-                current_signature = self._page_signature()
-                if current_signature != previous_signature and len(self.driver.page_source) > 50000:
-                    logger.info("✅ Page navigation detected.")
+            # Wait for the old card to go stale (or, if the list is re-rendered in place,
+            # for the signature to change), then for a card of the new page
+            def _page_changed(driver) -> bool:
+                if old_card is not None and EC.staleness_of(old_card)(driver):
                     return True
-            logger.warning("⌛ Timeout waiting for next page content.")
-            return False
+                current_signature = self._page_signature()
+                return bool(current_signature) and current_signature != previous_signature
+
+            try:
+                wait = WebDriverWait(self.driver, timeout, poll_frequency=0.2)
+                wait.until(_page_changed)
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+            except TimeoutException:
+                logger.warning("⌛ Timeout waiting for next page content.")
+                return False
+            logger.info("✅ Page navigation detected.")
+            return True
         except Exception as e:
             logger.error(f"❌ Error during pagination: {e}")
             return False
@@ -591,91 +1222,42 @@ class MinimalUrbaniaScraper:
     def _page_signature(self) -> str:
         """Generate a lightweight signature for current page content."""
         try:
-            src = self.driver.page_source
-            return f"{len(src)}::{src[:3000]}"
+            # The first card's link identifies the page; no innerText layout pass, a few bytes back
+            return self.driver.execute_script(
+                "var c = document.querySelector('[class*=card-container]');"
+                "var a = c && (c.getAttribute('data-to-posting') || (c.querySelector('a[href]') || {}).href);"
+                "return location.href + '::' + (a || document.body.scrollHeight);"
+            ) or ""
         except Exception:
             return ""
 
-    def extract_image_urls_from_element(self, element) -> List[str]:
-        """Extract image URLs from a property element.
-        Looks into <img> tags (src, data-src, srcset, etc.), anchors to images, and CSS background images.
-        """
-        urls: List[str] = []
-        seen = set()
-
-        def _add(url: Optional[str]):
-            if not url:
-                return
-            u = url.strip()
-            if not u:
-                return
-            # Normalize protocol-relative URLs
-            if u.startswith('//'):
-                u = 'https:' + u
-            # Filter obvious non-image trackers
-            if any(token in u.lower() for token in [
-                'sprite', 'icon', 'logo', 'placeholder', 'tracking', 'analytics']):
-                pass  # still allow; filtering can be adjusted if needed
-            if u not in seen:
-                seen.add(u)
-                urls.append(u)
-
-        try:
-            # <img> tags
-            img_elems = element.find_elements(By.CSS_SELECTOR, 'img')
-            for img in img_elems:
-                for attr in ['src', 'data-src', 'data-lazy', 'data-original']:
-                    _add(img.get_attribute(attr))
-                # srcset may contain multiple URLs
-                srcset = img.get_attribute('srcset') or img.get_attribute('data-srcset')
-                if srcset:
-                    for part in srcset.split(','):
-                        u = part.strip().split(' ')[0]
-                        _add(u)
-        except Exception:
-            pass
-
-        try:
-            # Anchors linking directly to images
-            a_elems = element.find_elements(By.CSS_SELECTOR, 'a[href]')
-            for a in a_elems:
-                href = a.get_attribute('href')
-                if href and any(href.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp']):
-                    _add(href)
-        except Exception:
-            pass
-
-        try:
-            # Background images in style attributes
-            styled = element.find_elements(By.CSS_SELECTOR, '*[style*="background"]')
-            bg_url_pattern = re.compile(r'url\((\"|\')?(?P<u>[^)\"\']+)', re.IGNORECASE)
-            for el in styled:
-                style = el.get_attribute('style') or ''
-                for m in bg_url_pattern.finditer(style):
-                    _add(m.group('u'))
-        except Exception:
-            pass
-
-        return urls
-
-    def download_images_for_properties(self, properties: List[Dict[str, Any]]):
-        """Download images for each property into a structured directory."""
-        try:
-            os.makedirs(self.images_dir, exist_ok=True)
-        except Exception as e:
-            logger.warning(f"⚠️ Could not create images directory: {e}")
-            return
+    def _ensure_dir(self, path: str):
+        """os.makedirs once per folder per run (no repeated stat on network mounts)."""
+        if path not in self._dirs_created:
+            os.makedirs(path, exist_ok=True)
+            self._dirs_created.add(path)
 
+    def image_session(self) -> requests.Session:
+        """Pooled session for image requests, mirroring the browser's UA and cookies
+        (built once per scraper; the cookies are read from the driver only then)."""
+        if self._image_session is not None:
+            return self._image_session
         session = requests.Session()
+        # One keep-alive pool for the whole run; transient CDN errors are retried by the adapter
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(
+            total=2, backoff_factor=0.3, status_forcelist=_RETRY_STATUSES,
+            allowed_methods=('GET', 'HEAD'), raise_on_status=False))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         # Try to mirror the browser headers & cookies to avoid CDN 403
         try:
             ua = self.driver.execute_script("return navigator.userAgent") or "Mozilla/5.0"
         except Exception:
             ua = "Mozilla/5.0"
-        referer = self.driver.current_url if self.driver else self.base_url
         session.headers.update({
             "User-Agent": ua,
-            "Referer": referer,
+            # The site itself as referer is what the CDN accepts; no per-image retry needed
+            "Referer": self.base_url,
             "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
             "Accept-Language": "es-PE,es;q=0.9,en;q=0.8",
             "Connection": "keep-alive"
@@ -688,104 +1270,223 @@ class MinimalUrbaniaScraper:
                     continue
         except Exception:
             pass
+        self._image_session = session
+        return session
 
-        def _safe_filename_from_url(url: str) -> str:
+    def download_images_for_properties(self, properties: List[Dict[str, Any]]):
+        """Download images for each property into a structured directory,
+        `image_workers` at a time over one pooled keep-alive session."""
+        # With a bucket, images go straight to GCS (<prefix>/images/<id>/...) and never touch the disk
+        to_gcs = self._gcs_bucket is not None
+        if to_gcs:
+            images_prefix = f"{self.gcs_prefix.rstrip('/')}/images"
+            # One listing instead of an exists() call per image: {property folder: file names}
+            uploaded: Dict[str, set] = {}
             try:
-                path = urlparse(url).path
-                name = os.path.basename(path) or "image"
-                return unquote(name.split('?')[0])
-            except Exception:
-                return "image"
+                for b in self._gcs_bucket.list_blobs(prefix=images_prefix + '/'):
+                    folder, _, name = b.name.rpartition('/')
+                    uploaded.setdefault(folder, set()).add(name)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not list uploaded images: {e}")
+        else:
+            try:
+                self._ensure_dir(self.images_dir)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create images directory: {e}")
+                return
 
-        total = len(properties)
+        session = self.image_session()
+
+        # Flatten to one job per image so a property with many photos does not serialize the rest
+        jobs = []
+        expected: Dict[Any, int] = {}
+        saved: Dict[Any, int] = {}
         for i, prop in enumerate(properties, start=1):
+            prop_id = prop.get('global_index') or prop.get('index') or i
+            # Same URL twice in a property is fetched once
+            urls = list(dict.fromkeys(prop.get('image_urls') or []))
+            expected[prop_id] = len(urls)
+            saved[prop_id] = 0
+            if to_gcs:
+                prop_dir = f"{images_prefix}/{prop_id}"
+                existing = uploaded.get(prop_dir, set())
+            else:
+                try:
+                    prop_dir = os.path.join(self.images_dir, str(prop_id))
+                    self._ensure_dir(prop_dir)
+                    # One directory listing instead of a stat per image
+                    existing = {e.name for e in os.scandir(prop_dir)}
+                except Exception as e:
+                    logger.warning(f"⚠️ Error downloading images for property {i}: {e}")
+                    continue
+            for j, url in enumerate(urls, start=1):
+                if not url or not url.startswith('http'):
+                    continue
+                fname = _safe_filename_from_url(url)
+                # ensure unique name
+                name = f"{j:02d}_{fname}"
+                # skip if exists
+                if name in existing:
+                    saved[prop_id] += 1
+                    continue
+                # An image extension vouches for the file when the CDN sends a generic Content-Type
+                has_ext = fname.lower().endswith(_IMAGE_EXTS)
+                target = f"{prop_dir}/{name}" if to_gcs else os.path.join(prop_dir, name)
+                jobs.append((prop_id, url, has_ext, target))
+
+        if to_gcs:
+            # GCS uploads are blocking calls, so they run on the thread pool
+            with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+                futures = {pool.submit(self._upload_one_to_gcs, session, url, has_ext, key): prop_id
+                           for prop_id, url, has_ext, key in jobs}
+                for future in as_completed(futures):
+                    if future.result():
+                        saved[futures[future]] += 1
+        elif httpx is not None:
+            # HTTP/2: all images of the CDN host multiplexed over a few connections
+            results = asyncio.run(self._download_all_http2(session, jobs))
+            for (prop_id, *_), ok in zip(jobs, results):
+                saved[prop_id] += ok
+        else:
+            with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+                futures = {pool.submit(self._download_one, session, url, has_ext, target_path): prop_id
+                           for prop_id, url, has_ext, target_path in jobs}
+                for future in as_completed(futures):
+                    if future.result():
+                        saved[futures[future]] += 1
+
+        total = len(expected)
+        for i, prop_id in enumerate(expected, start=1):
+            logger.info(f"🖼️  [{i}/{total}] Property {prop_id}: saved {saved[prop_id]}/{expected[prop_id]} images")
+
+    def _download_one(self, session: requests.Session, url: str, has_ext: bool, target_path: str) -> bool:
+        """Stream one image to disk (transient errors are retried by the session's adapter)."""
+        try:
+            with session.get(url, timeout=25, stream=True) as resp:
+                ctype = (resp.headers.get('Content-Type') or '').lower()
+                if resp.status_code != 200 or not ('image' in ctype or has_ext):
+                    return False
+                # Decided from the headers, before any file is created
+                if _declared_too_small(resp.headers):
+                    return False
+                # A partial file would be skipped as "exists" on the next run
+                part_path = target_path + '.part'
+                size = 0
+                with open(part_path, 'wb', buffering=_IMAGE_WRITE_BUFFER) as out:
+                    for chunk in resp.iter_content(65536):
+                        out.write(chunk)
+                        size += len(chunk)
+                if size:
+                    os.replace(part_path, target_path)
+                    return True
+                os.remove(part_path)
+        except Exception:
+            pass
+        return False
+
+    def _upload_one_to_gcs(self, session: requests.Session, url: str, has_ext: bool, key: str) -> bool:
+        """Stream one image from the CDN into a GCS blob without a local copy."""
+        try:
+            with session.get(url, timeout=25, stream=True) as resp:
+                ctype = (resp.headers.get('Content-Type') or '').lower()
+                if resp.status_code != 200 or not ('image' in ctype or has_ext):
+                    return False
+                if _declared_too_small(resp.headers):
+                    return False
+                resp.raw.decode_content = True
+                # Known size -> single multipart request; unknown/encoded -> chunked resumable upload
+                size = None if resp.headers.get('Content-Encoding') else int(resp.headers.get('Content-Length') or 0) or None
+                # The blob only becomes visible once the whole body has been uploaded
+                self._gcs_bucket.blob(key).upload_from_file(
+                    resp.raw, content_type=ctype or None, size=size, if_generation_match=0)
+                return True
+        except Exception:
+            pass
+        return False
+
+    async def _download_all_http2(self, session: requests.Session, jobs: List[tuple]) -> List[bool]:
+        """Download every (prop_id, url, has_ext, target_path) job over one httpx HTTP/2 client
+        with the session's headers and cookies; at most 4 x image_workers in flight."""
+        limit = asyncio.Semaphore(self.image_workers * 4)
+        limits = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        # Connection-specific headers are not allowed on HTTP/2
+        headers = {k: v for k, v in session.headers.items() if k.lower() != 'connection'}
+        async with httpx.AsyncClient(http2=True, limits=limits, timeout=25, follow_redirects=True,
+                                     headers=headers, cookies=session.cookies) as client:
+            async def _one(url: str, has_ext: bool, target_path: str) -> bool:
+                async with limit:
+                    return await self._download_one_async(client, url, has_ext, target_path)
+            return await asyncio.gather(*(_one(url, has_ext, path) for _, url, has_ext, path in jobs))
+
+    async def _download_one_async(self, client, url: str, has_ext: bool, target_path: str) -> bool:
+        """Async twin of _download_one (same checks and .part file); retries the
+        statuses the requests adapter would, up to twice with backoff."""
+        for attempt in range(3):
+            if attempt:
+                await asyncio.sleep(0.3 * 2 ** (attempt - 1))
             try:
-                prop_id = prop.get('global_index') or prop.get('index') or i
-                prop_dir = os.path.join(self.images_dir, str(prop_id))
-                os.makedirs(prop_dir, exist_ok=True)
-                urls = prop.get('image_urls') or []
-                saved = 0
-                for j, url in enumerate(urls, start=1):
-                    try:
-                        if not url or not url.startswith('http'):
-                            continue
-                        fname = _safe_filename_from_url(url)
-                        # ensure unique name
-                        target_path = os.path.join(prop_dir, f"{j:02d}_{fname}")
-                        # skip if exists
-                        if os.path.exists(target_path):
-                            saved += 1
-                            continue
-                        resp = session.get(url, timeout=25)
-                        ctype = (resp.headers.get('Content-Type') or '').lower()
-                        if resp.status_code == 200 and resp.content and ('image' in ctype or any(fname.lower().endswith(ext) for ext in ['.jpg','.jpeg','.png','.webp'])):
-                            with open(target_path, 'wb') as out:
-                                out.write(resp.content)
-                            saved += 1
-                        else:
-                            # One retry tweaking headers
-                            retry_headers = {"Referer": self.base_url}
-                            resp2 = session.get(url, timeout=25, headers=retry_headers)
-                            ctype2 = (resp2.headers.get('Content-Type') or '').lower()
-                            if resp2.status_code == 200 and resp2.content and ('image' in ctype2 or any(fname.lower().endswith(ext) for ext in ['.jpg','.jpeg','.png','.webp'])):
-                                with open(target_path, 'wb') as out:
-                                    out.write(resp2.content)
-                                saved += 1
-                    except Exception:
+                async with client.stream('GET', url) as resp:
+                    if resp.status_code in _RETRY_STATUSES:
                         continue
-                logger.info(f"🖼️  [{i}/{total}] Property {prop_id}: saved {saved}/{len(urls)} images")
-            except Exception as e:
-                logger.warning(f"⚠️ Error downloading images for property {i}: {e}")
+                    ctype = (resp.headers.get('Content-Type') or '').lower()
+                    if resp.status_code != 200 or not ('image' in ctype or has_ext):
+                        return False
+                    if _declared_too_small(resp.headers):
+                        return False
+                    part_path = target_path + '.part'
+                    size = 0
+                    with open(part_path, 'wb', buffering=_IMAGE_WRITE_BUFFER) as out:
+                        async for chunk in resp.aiter_bytes(65536):
+                            out.write(chunk)
+                            size += len(chunk)
+                    if size:
+                        os.replace(part_path, target_path)
+                        return True
+                    os.remove(part_path)
+                    return False
+            except Exception:
+                continue
+        return False
 
     def download_image_via_browser(self, url: str, target_path: str) -> bool:
-        """Fallback: open the image URL in a new tab via window.open (keeps referrer),
-        then capture a full-page screenshot as PNG.
-        """
+        """Fallback for a single image: fetch it with the browser's cookies, UA and the
+        site as referer (image_session) and save the original bytes."""
+        if not url.startswith('http'):
+            return False
         try:
-            if not url.startswith('http'):
-                return False
-            original = self.driver.current_window_handle
-            # Open in a real tab so referrer is preserved
-            self.driver.execute_script("window.open(arguments[0], '_blank');", url)
-            WebDriverWait(self.driver, 10).until(lambda d: len(d.window_handles) > 1)
-            new_handle = [h for h in self.driver.window_handles if h != original][-1]
-            self.driver.switch_to.window(new_handle)
-            # Wait a bit for image to render
-            time.sleep(2)
-            # Take full tab screenshot
-            png = self.driver.get_screenshot_as_png()
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            with open(target_path, 'wb') as f:
-                f.write(png)
-            # Close the tab and return
-            self.driver.close()
-            self.driver.switch_to.window(original)
-            return True
+            self._ensure_dir(os.path.dirname(target_path) or '.')
         except Exception:
-            try:
-                if len(self.driver.window_handles) > 0:
-                    self.driver.switch_to.window(self.driver.window_handles[0])
-            except Exception:
-                pass
             return False
+        has_ext = urlparse(url).path.lower().endswith(_IMAGE_EXTS)
+        return self._download_one(self.image_session(), url, has_ext, target_path)
 
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='Urbania Minimal Scraper')
-    parser.add_argument('--download-images', action='store_true', help='Download property images to disk')
+    parser.add_argument('--download-images', action='store_true', help='Download property images (to GCS when a bucket is configured, else to --images-dir)')
     parser.add_argument('--images-dir', type=str, default='images', help='Directory to save downloaded images')
+    parser.add_argument('--image-workers', type=int, default=16, help='Images downloaded in parallel')
     parser.add_argument('--max-pages', type=int, default=None, help='Override number of pages to traverse')
     parser.add_argument('--gcs-bucket', type=str, default='urbania_scrapper', help='GCS bucket name')
     parser.add_argument('--gcs-prefix', type=str, default='raw_data', help='GCS prefix (folder)')
     parser.add_argument('--gcp-keyfile', type=str, default=None, help='Path to GCP service account JSON key')
+    parser.add_argument('--cookies-file', type=str, default='.uc_cookies.json', help="File where Cloudflare cookies are kept between runs ('' to disable)")
+    parser.add_argument('--load-assets', action='store_true', help='Do not block images, fonts and trackers in the browser')
+    parser.add_argument('--browser-pages', action='store_true', help='Load every page in the browser instead of over HTTP')
+    parser.add_argument('--workers', type=int, default=1, help='Browsers scraping page shards in parallel')
     args = parser.parse_args()
 
     scraper = MinimalUrbaniaScraper()
     scraper.download_images = bool(args.download_images)
     scraper.images_dir = args.images_dir or scraper.images_dir
+    scraper.image_workers = max(1, args.image_workers)
     scraper.gcs_bucket_name = args.gcs_bucket
     scraper.gcs_prefix = args.gcs_prefix or scraper.gcs_prefix
     scraper.gcp_keyfile = args.gcp_keyfile
+    scraper.workers = max(1, args.workers)
+    scraper.use_http = not args.browser_pages
+    scraper.block_assets = not args.load_assets
+    scraper.cookies_path = args.cookies_file or None
     scraper.setup_gcs()
 
     if args.max_pages is not None and args.max_pages > 0: